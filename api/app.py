@@ -1,42 +1,424 @@
-from flask import Flask, request, jsonify, send_file
-from io import BytesIO
-import boto3
+from flask import Flask, Response, request, jsonify, send_file
+from werkzeug.http import http_date
+from api.cache import ResultCache
+from api.matcher import build_tag_matcher, match_tags
+from api.metrics import count_storage, count_storage_bytes, family, stage
+from api import metrics
+from devlaunch.storage import InvalidRange, NotFound, NotModified, get_storage
+import hashlib
+import heapq
+import json
+import mimetypes
+import tarfile
 import yaml
-import re
 import os
+import threading
+import time
+import zlib
 
 app = Flask(__name__)
 
 BUCKET_NAME = "devlaunch-templates-bucket"
 INDEX_FILE_KEY = "index.yaml"
 TAGS_FILE_KEY = "tags.yaml"
+CATALOG_POINTER_KEY = "catalog/current.json"
+CATALOG_FORMAT = 1
 
-s3 = boto3.client("s3")
+# How long a loaded catalog is trusted before it is revalidated in storage;
+# also how often the background refresher polls for a new version.
+CATALOG_TTL = float(os.environ.get("DEVLAUNCH_CATALOG_TTL", "30"))
 
+DEFAULT_TOP_K = 5
+MAX_TOP_K = 50
+MAX_BATCH_SIZE = 1000
 
-def load_yaml_from_s3(key):
-    obj = s3.get_object(Bucket=BUCKET_NAME, Key=key)
-    content = obj["Body"].read().decode("utf-8")
-    return yaml.safe_load(content)
+RESOLVE_CACHE_SIZE = int(os.environ.get("DEVLAUNCH_RESOLVE_CACHE_SIZE", "4096"))
+RESOLVE_CACHE_TTL = float(os.environ.get("DEVLAUNCH_RESOLVE_CACHE_TTL", "300"))
 
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+BUNDLE_COMPRESSION_LEVEL = 6
 
-def load_known_tags():
-    return set(load_yaml_from_s3(TAGS_FILE_KEY))
+storage = get_storage(BUCKET_NAME)
 
+_catalog = None
+_catalog_lock = threading.Lock()
+_refresher = None
+_refresher_stop = threading.Event()
+_catalog_pinned = False
 
-def extract_tags(prompt: str, known_tags: set):
-    words = re.findall(r"\b\w+\b", prompt.lower())
-    return set(word for word in words if word in known_tags)
+resolve_cache = ResultCache(RESOLVE_CACHE_SIZE, RESOLVE_CACHE_TTL)
+
+
+def load_object(key):
+    with stage("storage_get"):
+        data = storage.read(key)
+    count_storage("get", len(data))
+    return data.decode("utf-8")
+
+
+def load_yaml(key):
+    return yaml.safe_load(load_object(key))
+
+
+# Conditional GET: returns (None, etag) when the object is unchanged.
+def fetch_if_changed(key, etag=None, parse=yaml.safe_load):
+    with stage("storage_get"):
+        try:
+            obj = storage.get(key, if_none_match=etag)
+        except NotModified:
+            count_storage("get")
+            return None, etag
+        content = obj["Body"].read()
+    count_storage("get", len(content))
+    with stage("parse"):
+        return parse(content.decode("utf-8")), obj.get("ETag")
+
+
+# Template ids are positions in the index, so every postings list is built
+# already sorted. "exact" maps a full tag set to the first template carrying
+# it, which keeps the old first-match-wins behaviour of the linear scan.
+# Postings precomputed by the indexer are used as they are.
+def build_postings(index, postings=None):
+    precomputed = postings is not None
+    postings = postings if precomputed else {}
+    exact = {}
+    sizes = []
+    for template_id, entry in enumerate(index):
+        tags = frozenset(entry.get("tags") or [])
+        sizes.append(len(tags))
+        exact.setdefault(tags, template_id)
+        if not precomputed:
+            for tag in tags:
+                postings.setdefault(tag, []).append(template_id)
+    return postings, exact, sizes
+
+
+# File manifests and bundle locations stay out of the entries returned to
+# clients; the manifest is sent once, for the matched template only.
+def summarize_entry(entry):
+    return {
+        key: value for key, value in entry.items() if key not in ("files", "bundle")
+    }
+
+
+def build_catalog(tags, index, etags, version, postings=None, synonyms=None):
+    with stage("catalog_build"):
+        return make_catalog(tags, index, etags, version, postings, synonyms)
+
+
+def make_catalog(tags, index, etags, version, postings, synonyms):
+    index = list(index or [])
+    tags = frozenset(tags or [])
+    postings, exact, sizes = build_postings(index, postings)
+    return {
+        "tags": tags,
+        "matcher": build_tag_matcher(tags, synonyms),
+        "index": index,
+        "summaries": [summarize_entry(entry) for entry in index],
+        "by_url": {entry.get("url"): entry for entry in index},
+        "postings": postings,
+        "exact": exact,
+        "sizes": sizes,
+        "etags": etags,
+        "version": version,
+        "checked_at": time.monotonic(),
+    }
+
+
+# Tag ids in the artifact index into its sorted tag list; they are turned
+# back into names once, at load time.
+def load_catalog_artifact(artifact, etags):
+    tags = artifact["tags"]
+    index = [
+        dict(entry, tags=[tags[tag_id] for tag_id in entry["tags"]])
+        for entry in artifact["templates"]
+    ]
+    postings = {tags[tag_id]: ids for tag_id, ids in enumerate(artifact["postings"])}
+    return build_catalog(
+        tags,
+        index,
+        etags,
+        artifact["version"],
+        postings,
+        artifact.get("synonyms"),
+    )
+
+
+# The pointer is tiny and revalidated with a conditional GET; the versioned
+# artifact it names is immutable and only fetched when the version changes.
+def refresh_catalog(current=None):
+    etags = current["etags"] if current else {}
+    try:
+        pointer, pointer_etag = fetch_if_changed(
+            CATALOG_POINTER_KEY, etags.get(CATALOG_POINTER_KEY), json.loads
+        )
+    except NotFound:
+        # Published by an indexer that predates versioned catalogs.
+        return refresh_yaml_catalog(current)
+
+    if pointer is not None and pointer.get("format") != CATALOG_FORMAT:
+        app.logger.warning("Unsupported catalog format %s", pointer.get("format"))
+        return refresh_yaml_catalog(current)
+
+    if current is not None and (
+        pointer is None or pointer["version"] == current["version"]
+    ):
+        return dict(
+            current,
+            etags={CATALOG_POINTER_KEY: pointer_etag},
+            checked_at=time.monotonic(),
+        )
+
+    content = load_object(pointer["key"])
+    with stage("parse"):
+        artifact = json.loads(content)
+    return load_catalog_artifact(artifact, {CATALOG_POINTER_KEY: pointer_etag})
+
+
+def refresh_yaml_catalog(current=None):
+    etags = current["etags"] if current else {}
+    tags, tags_etag = fetch_if_changed(TAGS_FILE_KEY, etags.get(TAGS_FILE_KEY))
+    index, index_etag = fetch_if_changed(INDEX_FILE_KEY, etags.get(INDEX_FILE_KEY))
+
+    if current is not None and tags is None and index is None:
+        return dict(current, checked_at=time.monotonic())
+
+    if current is not None:
+        if tags is None:
+            tags = current["tags"]
+        if index is None:
+            index = current["index"]
+
+    return build_catalog(
+        tags,
+        index,
+        {TAGS_FILE_KEY: tags_etag, INDEX_FILE_KEY: index_etag},
+        index_etag,
+    )
+
+
+def catalog_is_fresh(catalog):
+    return (
+        catalog is not None and time.monotonic() - catalog["checked_at"] < CATALOG_TTL
+    )
+
+
+def refresher_running():
+    return _refresher is not None and _refresher.is_alive()
+
+
+# Snapshots are never mutated: a refresh builds a new dict and rebinds
+# _catalog, so a request sees either the old or the new catalog, never a mix.
+# While the background refresher runs, or the catalog is pinned, requests
+# take whatever snapshot is current and never wait for storage; otherwise
+# (and always before the first load) the catalog is revalidated inline once
+# the TTL has passed.
+def get_catalog():
+    global _catalog
+    catalog = _catalog
+    if catalog is not None and (
+        _catalog_pinned or refresher_running() or catalog_is_fresh(catalog)
+    ):
+        return catalog
+
+    with _catalog_lock:
+        catalog = _catalog
+        if catalog_is_fresh(catalog):
+            return catalog
+        try:
+            catalog = refresh_catalog(catalog)
+        except Exception as e:
+            if catalog is None:
+                raise
+            app.logger.warning("Catalog revalidation failed, serving stale: %s", e)
+            catalog = dict(catalog, checked_at=time.monotonic())
+        _catalog = catalog
+        return catalog
+
+
+# Revalidates now, regardless of the TTL. Used by the server process to pick
+# up a new index version before it forks fresh workers.
+def reload_catalog():
+    global _catalog
+    with _catalog_lock:
+        _catalog = refresh_catalog(_catalog)
+        return _catalog
+
+
+def refresh_forever(interval, on_change):
+    while not _refresher_stop.wait(interval):
+        previous = _catalog
+        try:
+            catalog = reload_catalog()
+        except Exception as e:
+            app.logger.warning("Background catalog refresh failed: %s", e)
+            continue
+        if on_change and catalog["version"] != catalog_version(previous):
+            on_change(catalog)
+
+
+def catalog_version(catalog):
+    return catalog["version"] if catalog else None
+
+
+# Polls the version pointer every CATALOG_TTL seconds on a daemon thread and
+# swaps in new versions off the request path. on_change(catalog) is called
+# from that thread after a new version has been swapped in. Must be started
+# again in a forked child, since threads do not survive fork.
+def start_catalog_refresher(interval=None, on_change=None):
+    global _refresher, _refresher_stop
+    if refresher_running():
+        return _refresher
+    _refresher_stop = threading.Event()
+    _refresher = threading.Thread(
+        target=refresh_forever,
+        args=(CATALOG_TTL if interval is None else interval, on_change),
+        name="catalog-refresher",
+        daemon=True,
+    )
+    _refresher.start()
+    return _refresher
+
+
+# For a worker whose catalog is kept current by the process it was forked
+# from (see api/gunicorn.conf.py): the inherited snapshot is served until that
+# process replaces the worker, and is never revalidated by the worker itself.
+def pin_catalog():
+    global _catalog_pinned
+    _catalog_pinned = True
+
+
+def stop_catalog_refresher():
+    global _refresher
+    _refresher_stop.set()
+    if _refresher is not None:
+        _refresher.join()
+    _refresher = None
+
+
+# Runs in every forked child, e.g. a gunicorn worker forked from the preloaded
+# master. The child gets its own storage client, because the parent's pooled
+# keep-alive sockets would otherwise be read and written by both processes.
+# Locks are recreated because one held by a parent thread at fork time would
+# stay locked in the child forever. The refresher thread does not survive
+# the fork and has to be started again.
+def reset_after_fork():
+    global storage, _catalog_lock, _refresher, _refresher_stop
+    storage = get_storage(BUCKET_NAME)
+    _catalog_lock = threading.Lock()
+    _refresher = None
+    _refresher_stop = threading.Event()
+    resolve_cache.lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=reset_after_fork)
+
+
+# Loads the catalog before serving so the first request does not pay for it.
+# Failures are logged and the first request tries again.
+def warm_catalog():
+    try:
+        return get_catalog()
+    except Exception as e:
+        app.logger.warning("Could not preload the catalog: %s", e)
+        return None
+
+
+def extract_tags(prompt: str, catalog):
+    return match_tags(prompt, catalog["matcher"])
+
+
+def template_prefix(entry):
+    prefix = os.path.dirname(entry.get("url", ""))
+    if prefix and not prefix.endswith("/"):
+        prefix += "/"
+    return prefix
 
 
 def list_files_in_prefix(prefix: str):
-    paginator = s3.get_paginator("list_objects_v2")
-    result = []
-    for page in paginator.paginate(Bucket=BUCKET_NAME, Prefix=prefix):
-        contents = page.get("Contents", [])
-        for obj in contents:
-            result.append(obj["Key"])
-    return result
+    keys = []
+    with stage("storage_list"):
+        for page in storage.list(prefix):
+            count_storage("list")
+            keys.extend(obj["Key"] for obj in page)
+    return keys
+
+
+# Only templates sharing at least one tag with the prompt are touched, so the
+# cost is proportional to the matching postings, not to the catalog size.
+def rank_templates(catalog, input_tags, top_k, exclude=None):
+    overlaps = {}
+    for tag in input_tags:
+        for template_id in catalog["postings"].get(tag, ()):
+            overlaps[template_id] = overlaps.get(template_id, 0) + 1
+    overlaps.pop(exclude, None)
+
+    sizes = catalog["sizes"]
+    scored = (
+        (
+            overlap / (len(input_tags) + sizes[template_id] - overlap),
+            overlap,
+            template_id,
+        )
+        for template_id, overlap in overlaps.items()
+    )
+    best = heapq.nlargest(top_k, scored, key=lambda s: (s[0], s[1], -s[2]))
+
+    return [
+        {
+            "template": catalog["summaries"][template_id],
+            "score": round(score, 4),
+            "overlap": overlap,
+        }
+        for score, overlap, template_id in best
+    ]
+
+
+def parse_top_k(payload):
+    top_k = payload.get("top_k", DEFAULT_TOP_K)
+    if isinstance(top_k, bool) or not isinstance(top_k, int):
+        raise ValueError("top_k must be an integer")
+    if not 0 <= top_k <= MAX_TOP_K:
+        raise ValueError(f"top_k must be between 0 and {MAX_TOP_K}")
+    return top_k
+
+
+def resolve_tags(catalog, input_tags, top_k):
+    template_id = catalog["exact"].get(frozenset(input_tags))
+    candidates = rank_templates(catalog, input_tags, top_k, exclude=template_id)
+
+    if template_id is None:
+        return {"matched": None, "candidates": candidates}
+
+    entry = catalog["index"][template_id]
+    manifest = entry.get("files")
+    if manifest is None:
+        # Index published before the indexer recorded file manifests.
+        files = list_files_in_prefix(template_prefix(entry))
+    else:
+        files = [item["key"] for item in manifest]
+
+    return {
+        "matched": catalog["summaries"][template_id],
+        "files": files,
+        "manifest": manifest,
+        "candidates": candidates,
+    }
+
+
+# Many prompts reduce to the same tags, so results are cached by the sorted
+# tag set (and top_k) for the current catalog version.
+def cached_resolve(catalog, input_tags, top_k):
+    key = (tuple(sorted(input_tags, key=str)), top_k)
+    result = resolve_cache.get(catalog["version"], key)
+    if result is not None:
+        metrics.RESOLVE_CACHE_HITS.inc()
+        return result, True
+
+    metrics.RESOLVE_CACHE_MISSES.inc()
+    result = resolve_tags(catalog, input_tags, top_k)
+    resolve_cache.put(catalog["version"], key, result)
+    return result, False
 
 
 @app.route("/resolve", methods=["POST"])
@@ -47,21 +429,211 @@ def resolve():
     if not prompt:
         return jsonify({"error": "No prompt provided"}), 400
 
-    known_tags = load_known_tags()
-    input_tags = extract_tags(prompt, known_tags)
-    index = load_yaml_from_s3(INDEX_FILE_KEY)
+    try:
+        top_k = parse_top_k(payload)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    catalog = get_catalog()
+    with stage("extract"):
+        input_tags = extract_tags(prompt, catalog)
+    with stage("match"):
+        result, hit = cached_resolve(catalog, input_tags, top_k)
+
+    response = jsonify(result)
+    response.headers["X-Cache"] = "HIT" if hit else "MISS"
+    return response
+
+
+# All prompts are resolved against one catalog snapshot, and prompts that
+# reduce to the same tag set are resolved once.
+@app.route("/resolve/batch", methods=["POST"])
+def resolve_batch():
+    payload = request.get_json()
+    prompts = payload.get("prompts")
+
+    if not isinstance(prompts, list) or not all(
+        isinstance(prompt, str) for prompt in prompts
+    ):
+        return jsonify({"error": "prompts must be a list of strings"}), 400
+    if len(prompts) > MAX_BATCH_SIZE:
+        return jsonify({"error": f"At most {MAX_BATCH_SIZE} prompts per batch"}), 400
+
+    try:
+        top_k = parse_top_k(payload)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    catalog = get_catalog()
+    resolved = {}
+    results = []
+    for prompt in prompts:
+        if not prompt:
+            results.append({"error": "No prompt provided"})
+            continue
+        with stage("extract"):
+            input_tags = frozenset(extract_tags(prompt, catalog))
+        if input_tags not in resolved:
+            with stage("match"):
+                resolved[input_tags] = cached_resolve(catalog, input_tags, top_k)[0]
+        results.append(resolved[input_tags])
+
+    return jsonify(
+        {
+            "index_version": catalog["version"],
+            "unique": len(resolved),
+            "results": results,
+        }
+    )
+
+
+@app.route("/stats", methods=["GET"])
+def stats():
+    catalog = get_catalog()
+    return jsonify(
+        {
+            "index_version": catalog["version"],
+            "templates": len(catalog["index"]),
+            "tags": len(catalog["tags"]),
+            "resolve_cache": resolve_cache.stats(),
+        }
+    )
+
+
+def collect_metrics():
+    catalog = _catalog
+    cache = resolve_cache.stats()
+    # Gauges describe this process's own cache and catalog; the hit and miss
+    # counters are in api.metrics so they add up across workers.
+    families = [
+        family(
+            "devlaunch_resolve_cache_hit_ratio",
+            "gauge",
+            "Share of this worker's resolve cache lookups that hit.",
+            cache["hit_ratio"],
+        ),
+        family(
+            "devlaunch_resolve_cache_entries",
+            "gauge",
+            "Entries in the resolve cache.",
+            cache["size"],
+        ),
+    ]
+    if catalog is not None:
+        families += [
+            family(
+                "devlaunch_index_info",
+                "gauge",
+                "Version of the loaded index.",
+                1,
+                [("version", catalog["version"])],
+            ),
+            family(
+                "devlaunch_index_templates",
+                "gauge",
+                "Templates in the loaded index.",
+                len(catalog["index"]),
+            ),
+            family(
+                "devlaunch_index_tags",
+                "gauge",
+                "Tags in the loaded index.",
+                len(catalog["tags"]),
+            ),
+            family(
+                "devlaunch_index_age_seconds",
+                "gauge",
+                "Seconds since the index was last revalidated.",
+                round(time.monotonic() - catalog["checked_at"], 3),
+            ),
+        ]
+    return families
+
+
+metrics.init_app(app, [collect_metrics])
+
+
+def stream_body(body):
+    sent = 0
+    try:
+        for chunk in body.iter_chunks(DOWNLOAD_CHUNK_SIZE):
+            sent += len(chunk)
+            yield chunk
+    finally:
+        body.close()
+        count_storage_bytes("get", sent)
 
-    for entry in index:
-        template_tags = set(entry.get("tags", []))
-        if template_tags == input_tags:
-            url = entry.get("url", "")
-            prefix = os.path.dirname(url)
-            if prefix and not prefix.endswith("/"):
-                prefix += "/"
-            files = list_files_in_prefix(prefix)
-            return jsonify({"matched": entry, "files": files})
 
-    return jsonify({"matched": None})
+def object_headers(obj):
+    headers = {"Accept-Ranges": "bytes"}
+    if obj.get("ETag"):
+        headers["ETag"] = obj["ETag"]
+    if obj.get("LastModified"):
+        headers["Last-Modified"] = http_date(obj["LastModified"])
+    if obj.get("ContentLength") is not None:
+        headers["Content-Length"] = str(obj["ContentLength"])
+    if obj.get("ContentRange"):
+        headers["Content-Range"] = obj["ContentRange"]
+    return headers
+
+
+# Files on local storage go through send_file, which answers Range and
+# If-None-Match itself and hands the file to the server's sendfile path.
+def send_local_file(path, download_name, mimetype=None):
+    count_storage("get")
+    try:
+        st = os.stat(path)
+    except (FileNotFoundError, NotADirectoryError):
+        return jsonify({"error": "File not found"}), 404
+    count_storage_bytes("get", st.st_size)
+
+    return send_file(
+        path,
+        mimetype=mimetype,
+        as_attachment=True,
+        download_name=download_name,
+        etag=storage.etag(st).strip('"'),
+        conditional=True,
+    )
+
+
+# Range and If-None-Match are forwarded to the backend, which answers them
+# natively; the body is then relayed chunk by chunk instead of being buffered.
+def send_object(key, download_name, mimetype=None):
+    try:
+        path = storage.local_path(key)
+    except NotFound:
+        return jsonify({"error": "File not found"}), 404
+    if path is not None:
+        return send_local_file(path, download_name, mimetype)
+
+    if_none_match = request.headers.get("If-None-Match")
+    count_storage("get")
+    try:
+        with stage("storage_get"):
+            obj = storage.get(
+                key,
+                if_none_match=if_none_match,
+                byte_range=request.headers.get("Range"),
+            )
+    except NotFound:
+        return jsonify({"error": "File not found"}), 404
+    except NotModified:
+        return Response(status=304, headers={"ETag": if_none_match})
+    except InvalidRange:
+        return jsonify({"error": "Requested range not satisfiable"}), 416
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+    response = Response(
+        stream_body(obj["Body"]),
+        status=206 if obj.get("ContentRange") else 200,
+        headers=object_headers(obj),
+        mimetype=mimetype or mimetypes.guess_type(key)[0] or "application/octet-stream",
+        direct_passthrough=True,
+    )
+    response.headers.set("Content-Disposition", "attachment", filename=download_name)
+    return response
 
 
 @app.route("/download", methods=["GET"])
@@ -70,18 +642,84 @@ def download_file():
     if not key:
         return jsonify({"error": "No key provided"}), 400
 
-    try:
-        obj = s3.get_object(Bucket=BUCKET_NAME, Key=key)
-        file_stream = BytesIO(obj["Body"].read())
-        file_stream.seek(0)
-        return send_file(
-            file_stream, as_attachment=True, download_name=os.path.basename(key)
-        )
-    except s3.exceptions.NoSuchKey:
-        return jsonify({"error": "File not found"}), 404
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    return send_object(key, os.path.basename(key))
+
+
+def bundle_etag(manifest):
+    digest = hashlib.sha256()
+    for item in manifest:
+        digest.update(f"{item['key']}\0{item['etag']}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+# Writes the tar stream by hand (header, data, padding) so each object body is
+# relayed chunk by chunk through the gzip compressor; tarfile.addfile would
+# have to buffer a whole member before anything could be sent.
+def stream_bundle(prefix, keys):
+    compressor = zlib.compressobj(
+        BUNDLE_COMPRESSION_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS
+    )
+    for key in keys:
+        count_storage("get")
+        obj = storage.get(key)
+        info = tarfile.TarInfo(key[len(prefix) :])
+        info.size = obj["ContentLength"]
+        info.mode = 0o644
+        if obj.get("LastModified"):
+            info.mtime = int(obj["LastModified"].timestamp())
+        yield compressor.compress(info.tobuf(tarfile.PAX_FORMAT))
+        for chunk in stream_body(obj["Body"]):
+            yield compressor.compress(chunk)
+        yield compressor.compress(tarfile.NUL * (-info.size % tarfile.BLOCKSIZE))
+    yield compressor.compress(tarfile.NUL * (tarfile.BLOCKSIZE * 2))
+    yield compressor.flush()
+
+
+# Serves a whole template as one .tar.gz: the indexer's prebuilt archive when
+# the index names one, otherwise an archive streamed from the template files.
+@app.route("/bundle", methods=["GET"])
+def download_bundle():
+    url = request.args.get("template")
+    if not url:
+        return jsonify({"error": "No template provided"}), 400
+
+    entry = get_catalog()["by_url"].get(url)
+    if entry is None:
+        return jsonify({"error": "Template not found"}), 404
+
+    prefix = template_prefix(entry)
+    download_name = f"{os.path.basename(prefix.rstrip('/')) or 'template'}.tar.gz"
+
+    bundle = entry.get("bundle")
+    if bundle:
+        return send_object(bundle["key"], download_name, "application/gzip")
+
+    manifest = entry.get("files")
+    if manifest is None:
+        keys = list_files_in_prefix(prefix)
+        etag = None
+    else:
+        keys = [item["key"] for item in manifest]
+        etag = bundle_etag(manifest)
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+            response.set_etag(etag)
+            return response
+
+    response = Response(
+        (chunk for chunk in stream_bundle(prefix, keys) if chunk),
+        mimetype="application/gzip",
+        direct_passthrough=True,
+    )
+    if etag:
+        response.set_etag(etag)
+    response.headers.set("Content-Disposition", "attachment", filename=download_name)
+    return response
 
 
+# Development server only; production runs under gunicorn with
+# api/gunicorn.conf.py.
 if __name__ == "__main__":
+    warm_catalog()
+    start_catalog_refresher()
     app.run(debug=True)
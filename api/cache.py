@@ -0,0 +1,56 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+# LRU cache with a TTL whose entries all belong to one catalog version.
+# Storing a result for a newer version drops everything cached for the old
+# one, so a reindex can never serve stale matches.
+class ResultCache:
+    def __init__(self, max_size=1024, ttl=300.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.version = None
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, version, key):
+        with self.lock:
+            entry = self.entries.get(key) if version == self.version else None
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, version, key, value):
+        if self.max_size <= 0:
+            return
+        with self.lock:
+            if version != self.version:
+                self.entries.clear()
+                self.version = version
+            self.entries[key] = (time.monotonic(), value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.version = None
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self.entries),
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
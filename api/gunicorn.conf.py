@@ -0,0 +1,98 @@
+import gc
+import multiprocessing
+import os
+import signal
+import tempfile
+
+# gunicorn -c api/gunicorn.conf.py api.app:app
+#
+# The app and its catalog are loaded once in the master (preload_app) and the
+# workers are forked from it, so they share the parsed index copy-on-write.
+# gc.freeze() moves everything loaded so far out of the collector's reach;
+# otherwise the first collection in each worker would touch, and so copy,
+# every page holding those objects.
+
+bind = os.environ.get("DEVLAUNCH_BIND", "0.0.0.0:5000")
+workers = int(
+    os.environ.get("DEVLAUNCH_WORKERS", str(multiprocessing.cpu_count() * 2 + 1))
+)
+worker_class = "gthread"
+threads = int(os.environ.get("DEVLAUNCH_THREADS", "4"))
+preload_app = True
+timeout = 60
+graceful_timeout = 30
+keepalive = 5
+
+# How often the master polls for a new index version. It is the only process
+# that does: on a new version it loads the catalog and sends itself SIGHUP,
+# so fresh workers are forked sharing the new catalog and the old ones finish
+# their requests before exiting. Workers serve the catalog they were forked
+# with and never poll or revalidate it themselves. Set to 0 to turn the
+# reload off; workers then revalidate on the request path once
+# DEVLAUNCH_CATALOG_TTL has passed.
+RELOAD_INTERVAL = float(os.environ.get("DEVLAUNCH_RELOAD_INTERVAL", "30"))
+
+# Each process writes its metric values here and /metrics sums them, so a
+# scrape reports every worker whichever one answers it (see api/metrics.py).
+# Set before the app is loaded; the directory is private to this server.
+if "DEVLAUNCH_METRICS_DIR" not in os.environ:
+    os.environ["DEVLAUNCH_METRICS_DIR"] = tempfile.mkdtemp(prefix="devlaunch-metrics-")
+
+
+def on_starting(server):
+    from api import metrics
+
+    metrics.clear_dir()
+
+
+def when_ready(server):
+    from api import app as api
+    from api import metrics
+
+    def reload_workers(catalog):
+        server.log.info("Index version %s published, reloading", catalog["version"])
+        os.kill(os.getpid(), signal.SIGHUP)
+
+    api.warm_catalog()
+    gc.freeze()
+    metrics.start_flusher()
+    if RELOAD_INTERVAL > 0:
+        api.start_catalog_refresher(RELOAD_INTERVAL, on_change=reload_workers)
+
+
+# Also runs on a manual `kill -HUP`, so operators can force a reload.
+def on_reload(server):
+    from api import app as api
+
+    try:
+        api.reload_catalog()
+    except Exception as e:
+        server.log.warning("Catalog reload failed, keeping the current one: %s", e)
+    gc.freeze()
+
+
+# api.app and api.metrics give each forked worker its own storage client and
+# locks (os.register_at_fork). The master's refresher thread does not survive
+# the fork and is not restarted: the master replaces the worker when a new
+# version is published, so the worker pins the catalog it was forked with.
+def post_fork(server, worker):
+    from api import app as api
+    from api import metrics
+
+    metrics.start_flusher()
+    if RELOAD_INTERVAL > 0:
+        api.pin_catalog()
+
+
+# Runs in the worker on a clean exit, so its final values reach the archive.
+def worker_exit(server, worker):
+    from api import metrics
+
+    metrics.flush()
+
+
+# Runs in the server once a worker is gone, however it exited.
+def child_exit(server, worker):
+    from api import metrics
+
+    metrics.archive_process(worker.pid)
@@ -0,0 +1,123 @@
+import re
+
+# Words are runs of letters and digits, so "node-js", "node_js" and
+# "Node.js" all tokenize to ["node", "js"].
+TOKEN_RE = re.compile(r"[^\W_]+")
+
+# Shorter words are never fuzzy-matched; at one edit they collide with
+# ordinary English too easily ("and" -> "ant").
+FUZZY_MIN_LENGTH = 5
+
+# Applied only when the target tag exists in the catalog. The indexer can
+# publish more through synonyms.yaml in the bucket.
+DEFAULT_SYNONYMS = {
+    "postgresql": "postgres",
+    "k8s": "kubernetes",
+    "mongo": "mongodb",
+    "elastic": "elasticsearch",
+}
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(str(text).lower())
+
+
+def deletions(word):
+    return {word[:i] + word[i + 1 :] for i in range(len(word))}
+
+
+# Optimal string alignment distance: Levenshtein plus adjacent swaps.
+def edit_distance(a, b):
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(
+                previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost
+            )
+            if (
+                previous2 is not None
+                and i > 1
+                and j > 1
+                and a[i - 1] == b[j - 2]
+                and a[i - 2] == b[j - 1]
+            ):
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+# Built once per catalog version:
+#   trie       token -> child node; a node's None key holds the tag that the
+#              token sequence leading to it spells
+#   vocabulary every word that occurs in some tag or synonym
+#   fuzzy      deletion index (word and its one-character deletions -> words),
+#              which finds every vocabulary word within one edit of a prompt
+#              word with O(len(word)) lookups
+def build_tag_matcher(tags, synonyms=None):
+    tags = set(tags)
+    phrases = [(tag, tag) for tag in sorted(tags, key=str)]
+    merged = {**DEFAULT_SYNONYMS, **(synonyms or {})}
+    phrases += [(alias, tag) for alias, tag in merged.items() if tag in tags]
+
+    trie = {}
+    vocabulary = set()
+    for phrase, tag in phrases:
+        tokens = tokenize(phrase)
+        if not tokens:
+            continue
+        variants = [tokens]
+        if len(tokens) > 1:
+            # "node-js" should also match a prompt saying "nodejs".
+            variants.append(["".join(tokens)])
+        for variant in variants:
+            node = trie
+            for token in variant:
+                node = node.setdefault(token, {})
+            node.setdefault(None, tag)
+            vocabulary.update(variant)
+
+    fuzzy = {}
+    for word in vocabulary:
+        if len(word) >= FUZZY_MIN_LENGTH:
+            for key in deletions(word) | {word}:
+                fuzzy.setdefault(key, set()).add(word)
+
+    return {"trie": trie, "vocabulary": frozenset(vocabulary), "fuzzy": fuzzy}
+
+
+def correct_token(matcher, token):
+    if token in matcher["vocabulary"] or len(token) < FUZZY_MIN_LENGTH:
+        return token
+
+    candidates = set()
+    for key in deletions(token) | {token}:
+        candidates.update(matcher["fuzzy"].get(key, ()))
+    close = sorted(word for word in candidates if edit_distance(token, word) <= 1)
+    return close[0] if close else token
+
+
+# Greedy longest match over the token stream: at each position the trie is
+# walked as far as the prompt allows and the longest complete tag wins.
+def match_tags(prompt, matcher):
+    tokens = [correct_token(matcher, token) for token in tokenize(prompt)]
+    trie = matcher["trie"]
+    found = set()
+
+    i = 0
+    while i < len(tokens):
+        node = trie
+        tag = None
+        end = i + 1
+        j = i
+        while j < len(tokens) and tokens[j] in node:
+            node = node[tokens[j]]
+            j += 1
+            if None in node:
+                tag, end = node[None], j
+        if tag is not None:
+            found.add(tag)
+        i = end
+    return found
@@ -0,0 +1,408 @@
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import Response, g, has_request_context, request
+
+from devlaunch.utils import atomic_open
+
+# Prometheus text exposition without the client library. Metrics are recorded
+# in the memory of the process that observes them. With DEVLAUNCH_METRICS_DIR
+# set (api/gunicorn.conf.py does so), every process also writes a snapshot of
+# its values to <dir>/<pid>.json every METRICS_FLUSH_INTERVAL seconds, and a
+# scrape sums those with its own live values. Whichever worker answers
+# /metrics reports the whole server. The snapshots of exited workers are
+# folded into archive.json, so counters never go backwards.
+
+METRICS_DIR = os.environ.get("DEVLAUNCH_METRICS_DIR")
+METRICS_FLUSH_INTERVAL = float(os.environ.get("DEVLAUNCH_METRICS_FLUSH_INTERVAL", "1"))
+ARCHIVE_FILE = "archive.json"
+LOCK_FILE = ".lock"
+
+LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(
+            name,
+            str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"),
+        )
+        for name, value in labels
+    )
+    return "{" + pairs + "}"
+
+
+def format_value(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels[name] for name in self.labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.values)
+
+    @staticmethod
+    def combine(value, other):
+        return value + other
+
+    def samples(self, values=None):
+        values = self.snapshot() if values is None else values
+        for key, value in sorted(values.items()):
+            yield self.name, list(zip(self.labels, key)), value
+
+
+# Bucket counts are kept per bucket and only made cumulative when rendered,
+# so observe() is one bisect and one increment under the lock.
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels[name] for name in self.labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.values.get(key)
+            if series is None:
+                series = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                key: [list(counts), total]
+                for key, (counts, total) in self.values.items()
+            }
+
+    @staticmethod
+    def combine(value, other):
+        return [[a + b for a, b in zip(value[0], other[0])], value[1] + other[1]]
+
+    def samples(self, values=None):
+        values = self.snapshot() if values is None else values
+        for key, (counts, total) in sorted(values.items()):
+            labels = list(zip(self.labels, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else format_value(bound)
+                yield f"{self.name}_bucket", labels + [("le", le)], cumulative
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, cumulative
+
+
+REQUEST_SECONDS = Histogram(
+    "devlaunch_request_duration_seconds",
+    "Time spent handling a request, up to the first byte of the body.",
+    ("route", "method", "status"),
+)
+STAGE_SECONDS = Histogram(
+    "devlaunch_stage_duration_seconds",
+    "Time spent in one stage of request or catalog handling.",
+    ("stage",),
+)
+STORAGE_REQUESTS = Counter(
+    "devlaunch_storage_requests_total",
+    "Calls made to the storage backend.",
+    ("operation",),
+)
+STORAGE_BYTES = Counter(
+    "devlaunch_storage_bytes_total",
+    "Bytes read from the storage backend.",
+    ("operation",),
+)
+
+RESOLVE_CACHE_HITS = Counter(
+    "devlaunch_resolve_cache_hits_total",
+    "Resolve cache hits.",
+)
+RESOLVE_CACHE_MISSES = Counter(
+    "devlaunch_resolve_cache_misses_total",
+    "Resolve cache misses.",
+)
+
+METRICS = [
+    REQUEST_SECONDS,
+    STAGE_SECONDS,
+    STORAGE_REQUESTS,
+    STORAGE_BYTES,
+    RESOLVE_CACHE_HITS,
+    RESOLVE_CACHE_MISSES,
+]
+
+
+_flusher = None
+_flush_lock = threading.Lock()
+
+
+# A lock held by another thread when the process forks stays locked in the
+# child, so every metric gets a fresh one there. The values are the parent's
+# and are already counted in its own snapshot, so the child starts from zero.
+def reset_after_fork():
+    global _flusher, _flush_lock
+    for metric in METRICS:
+        metric.lock = threading.Lock()
+        metric.values = {}
+    _flusher = None
+    _flush_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=reset_after_fork)
+
+
+def snapshot_path(pid=None, directory=None):
+    return os.path.join(directory or METRICS_DIR, f"{pid or os.getpid()}.json")
+
+
+# Label values come back from JSON as lists; keys are tuples again here.
+def load_snapshot(path):
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return {}
+    return {
+        name: {tuple(key): value for key, value in rows} for name, rows in data.items()
+    }
+
+
+def write_snapshot(path, snapshot):
+    data = {
+        name: [[list(key), value] for key, value in values.items()]
+        for name, values in snapshot.items()
+    }
+    with atomic_open(path, "w") as f:
+        json.dump(data, f)
+
+
+def merge_snapshots(snapshots):
+    totals = {metric.name: {} for metric in METRICS}
+    for snapshot in snapshots:
+        for metric in METRICS:
+            values = totals[metric.name]
+            for key, value in snapshot.get(metric.name, {}).items():
+                values[key] = (
+                    metric.combine(values[key], value) if key in values else value
+                )
+    return totals
+
+
+def local_snapshot():
+    return {metric.name: metric.snapshot() for metric in METRICS}
+
+
+# Scrapes hold the lock shared while they read the directory; folding an exited
+# process into the archive holds it exclusively, so a scrape never sees that
+# process both in the archive and in its own file, or in neither.
+@contextmanager
+def locked_dir(directory, exclusive=False):
+    import fcntl
+
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, LOCK_FILE), "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+# The snapshot is taken and written under one lock, so an older snapshot
+# from the flusher can never overwrite a newer one written by a scrape.
+def flush(directory=None):
+    with _flush_lock:
+        write_snapshot(snapshot_path(directory=directory), local_snapshot())
+
+
+def flush_forever(interval, directory):
+    while True:
+        time.sleep(interval)
+        try:
+            flush(directory)
+        except OSError:
+            pass
+
+
+# Starts this process's snapshot writer. Threads do not survive fork, so a
+# forked worker calls this again.
+def start_flusher(interval=None, directory=None):
+    global _flusher
+    directory = directory or METRICS_DIR
+    if not directory or (_flusher is not None and _flusher.is_alive()):
+        return _flusher
+    _flusher = threading.Thread(
+        target=flush_forever,
+        args=(METRICS_FLUSH_INTERVAL if interval is None else interval, directory),
+        name="metrics-flusher",
+        daemon=True,
+    )
+    _flusher.start()
+    return _flusher
+
+
+# Called by the server process once a worker has exited. Its last snapshot
+# is added to the archive and its file removed, before the pid can be reused.
+def archive_process(pid, directory=None):
+    directory = directory or METRICS_DIR
+    path = snapshot_path(pid, directory)
+    with locked_dir(directory, exclusive=True):
+        snapshot = load_snapshot(path)
+        if not snapshot:
+            return
+        archive = os.path.join(directory, ARCHIVE_FILE)
+        write_snapshot(archive, merge_snapshots([load_snapshot(archive), snapshot]))
+        os.unlink(path)
+
+
+# Removes the snapshots of an earlier server run; a restarted server counts
+# from zero like any other restarted process.
+def clear_dir(directory=None):
+    directory = directory or METRICS_DIR
+    os.makedirs(directory, exist_ok=True)
+    for entry in os.scandir(directory):
+        if entry.name.endswith(".json"):
+            os.unlink(entry.path)
+
+
+# Every process's values: the archive and each process's last snapshot. The
+# scraping process writes its own snapshot first, so whatever a scrape
+# reports is on disk for every later one and totals never go backwards.
+def combined_values(directory=None):
+    directory = directory or METRICS_DIR
+    flush(directory)
+    snapshots = []
+    with locked_dir(directory):
+        for entry in os.scandir(directory):
+            if entry.name.endswith(".json"):
+                snapshots.append(load_snapshot(entry.path))
+    return merge_snapshots(snapshots)
+
+
+# Times a block into STAGE_SECONDS. Inside a request the time is also added
+# to the response's Server-Timing header; repeated stages are summed.
+@contextmanager
+def stage(name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=name)
+        if has_request_context():
+            timings = g.setdefault("timings", {})
+            timings[name] = timings.get(name, 0.0) + elapsed
+
+
+def count_storage(operation, size=0):
+    STORAGE_REQUESTS.inc(operation=operation)
+    if size:
+        STORAGE_BYTES.inc(size, operation=operation)
+
+
+def count_storage_bytes(operation, size):
+    STORAGE_BYTES.inc(size, operation=operation)
+
+
+# A single-sample family, for values read from app state at scrape time.
+def family(name, kind, help, value, labels=()):
+    return name, kind, help, [(name, list(labels), value)]
+
+
+def render(collectors=(), directory=None):
+    directory = directory or METRICS_DIR
+    values = combined_values(directory) if directory else {}
+    lines = []
+    families = [
+        (metric.name, metric.kind, metric.help, metric.samples(values.get(metric.name)))
+        for metric in METRICS
+    ]
+    for collect in collectors:
+        families.extend(collect())
+
+    for name, kind, help, samples in families:
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} {kind}")
+        for sample, labels, value in samples:
+            lines.append(f"{sample}{format_labels(labels)} {format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def server_timing(timings, total):
+    entries = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in timings.items()]
+    entries.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(entries)
+
+
+# Adds GET /metrics and times every request. collectors are called at scrape
+# time and return extra (name, kind, help, samples) families, where samples
+# are (name, [(label, value)], value) tuples.
+def init_app(app, collectors=()):
+    @app.before_request
+    def start_timer():
+        g.started = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        started = g.pop("started", None)
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        REQUEST_SECONDS.observe(
+            elapsed,
+            route=route,
+            method=request.method,
+            status=response.status_code,
+        )
+        response.headers["Server-Timing"] = server_timing(g.get("timings", {}), elapsed)
+        return response
+
+    @app.route("/metrics", methods=["GET"])
+    def metrics():
+        return Response(
+            render(collectors), mimetype="text/plain; version=0.0.4; charset=utf-8"
+        )
@@ -0,0 +1,104 @@
+import os
+import random
+
+# Synthetic template trees shaped like the real bucket: one directory per
+# template holding template.yaml, a compose template and a README. Everything
+# is derived from the seed, so a given (size, seed) always produces the same
+# tree and the same prompts.
+
+BASE_TAGS = [
+    "docker",
+    "postgres",
+    "redis",
+    "nginx",
+    "mysql",
+    "mongodb",
+    "kafka",
+    "rabbitmq",
+    "elasticsearch",
+    "kubernetes",
+    "terraform",
+    "ansible",
+    "prometheus",
+    "grafana",
+    "node",
+    "python",
+    "django",
+    "flask",
+    "react",
+    "golang",
+]
+SYNTHETIC_TAGS = 200
+
+COMPOSE_TEMPLATE = """services:
+  {name}:
+    image: {image}:{{{{ version | default('latest') }}}}
+    ports:
+      - "{{{{ port | default({port}) }}}}:{port}"
+    environment:
+{environment}
+"""
+
+
+def tag_vocabulary():
+    return BASE_TAGS + [f"svc{i:03d}" for i in range(SYNTHETIC_TAGS)]
+
+
+def template_tags(rng, vocabulary):
+    return sorted(rng.sample(vocabulary, rng.randint(2, 5)))
+
+
+def write_file(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+
+
+def generate_catalog(root, size, seed=0):
+    rng = random.Random(seed)
+    vocabulary = tag_vocabulary()
+    templates = []
+    for i in range(size):
+        name = f"t{i:06d}"
+        tags = template_tags(rng, vocabulary)
+        environment = "\n".join(
+            f"      - {tag.upper()}_URL=http://{tag}:{rng.randint(1000, 9999)}"
+            for tag in tags
+        )
+        write_file(
+            os.path.join(root, name, "template.yaml"),
+            f"name: {name}\ntags: [{', '.join(tags)}]\n",
+        )
+        write_file(
+            os.path.join(root, name, "docker-compose.j2"),
+            COMPOSE_TEMPLATE.format(
+                name=name,
+                image=tags[0],
+                port=rng.randint(1000, 9999),
+                environment=environment,
+            ),
+        )
+        write_file(
+            os.path.join(root, name, "README.md"),
+            f"# {name}\n\n" + "Synthetic benchmark template.\n" * rng.randint(5, 50),
+        )
+        templates.append({"url": f"{name}/template.yaml", "tags": tags})
+    return templates
+
+
+# Mostly full tag sets (exact matches), with partial sets and unknown words
+# mixed in so ranking and the no-match path are exercised too.
+def generate_prompts(templates, count, seed=0):
+    rng = random.Random(seed + 1)
+    prompts = []
+    for _ in range(count):
+        tags = rng.choice(templates)["tags"]
+        roll = rng.random()
+        if roll < 0.6:
+            words = tags
+        elif roll < 0.9:
+            words = rng.sample(tags, max(1, len(tags) - 1))
+        else:
+            words = [f"unknown{rng.randint(0, 999)}"]
+        prompts.append(f"set up {' and '.join(words)} for my project")
+    return prompts
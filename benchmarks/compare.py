@@ -0,0 +1,81 @@
+import argparse
+import json
+import sys
+
+# python -m benchmarks.compare baseline.json candidate.json [--threshold 0.1]
+#
+# Prints every metric present in both result files with its relative change
+# and exits with status 1 when any of them regressed by more than the
+# threshold, so it can gate a CI job.
+
+# Higher is better for these; every other number is a duration.
+HIGHER_IS_BETTER = {"throughput"}
+IGNORED = {
+    "requests",
+    "errors",
+    "elapsed",
+    "templates",
+    "fetched_bytes",
+    "generate_seconds",
+}
+
+
+def flatten(data, prefix=""):
+    for key, value in data.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            yield from flatten(value, name)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            if key not in IGNORED:
+                yield name, key, value
+
+
+def compare(baseline, candidate, threshold):
+    old = {name: value for name, _, value in flatten(baseline["sizes"])}
+    rows = []
+    regressions = []
+    for name, key, new in flatten(candidate["sizes"]):
+        if name not in old or not old[name]:
+            continue
+        change = (new - old[name]) / old[name]
+        worse = -change if key in HIGHER_IS_BETTER else change
+        rows.append((name, old[name], new, change))
+        if worse > threshold:
+            regressions.append(name)
+    return rows, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two benchmark results")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="relative change counted as a regression (default 0.1 = 10%%)",
+    )
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    rows, regressions = compare(baseline, candidate, args.threshold)
+    print(f"baseline  {baseline.get('commit')}\ncandidate {candidate.get('commit')}\n")
+    width = max((len(name) for name, *_ in rows), default=0)
+    for name, old, new, change in rows:
+        marker = "  REGRESSION" if name in regressions else ""
+        print(f"{name:<{width}}  {old:>12.4f}  {new:>12.4f}  {change:+8.1%}{marker}")
+
+    if regressions:
+        print(
+            f"\n{len(regressions)} metric(s) regressed by more than {args.threshold:.0%}"
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,237 @@
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+# python -m benchmarks.run --sizes 1000,10000 --output results.json
+#
+# Generates a synthetic catalog per size on the local storage backend, runs
+# the indexer over it, serves it with the API on a local port and measures
+# /resolve, /download, /bundle and download_template_logic() against it.
+# Results are written as JSON; benchmarks.compare diffs two result files.
+
+os.environ.setdefault("DEVLAUNCH_STORAGE", "local")
+os.environ.setdefault("DEVLAUNCH_STORAGE_ROOT", tempfile.gettempdir())
+
+import requests
+from werkzeug.serving import make_server
+
+import api.app
+from benchmarks.catalog import generate_catalog, generate_prompts
+from devlaunch.bench import summarize
+from devlaunch import loader
+from devlaunch.storage import LocalStorage
+from devlaunch.templates import cache as template_cache
+from server import indexer
+
+DEFAULT_SIZES = "1000,10000"
+
+
+# Runs call(item) for every item on `concurrency` threads and summarizes the
+# per-call latencies; a call that raises or returns False counts as an error.
+def measure(call, items, concurrency):
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def timed(item):
+        nonlocal errors
+        started = time.perf_counter()
+        try:
+            ok = call(item) is not False
+        except Exception:
+            ok = False
+        elapsed = time.perf_counter() - started
+        with lock:
+            if ok:
+                latencies.append(elapsed)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(timed, items))
+    return summarize(latencies, time.perf_counter() - started, errors)
+
+
+def timed_call(call):
+    started = time.perf_counter()
+    result = call()
+    return time.perf_counter() - started, result
+
+
+class ApiServer:
+    def __init__(self):
+        self.server = make_server("127.0.0.1", 0, api.app.app, threaded=True)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.thread.join()
+
+
+def bench_indexer(storage):
+    indexer.storage = storage
+    with contextlib.redirect_stdout(io.StringIO()):
+        full, stats = timed_call(lambda: indexer.main(full=True))
+        noop, _ = timed_call(indexer.main)
+    return {
+        "full_seconds": round(full, 4),
+        "noop_seconds": round(noop, 4),
+        "templates": stats["templates"],
+        "fetched_bytes": stats["fetched_bytes"],
+    }
+
+
+def bench_api(server, templates, prompts, args):
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=args.concurrency)
+    session.mount("http://", adapter)
+    rng = random.Random(args.seed + 2)
+
+    def resolve(prompt):
+        return session.post(f"{server.url}/resolve", json={"prompt": prompt}).ok
+
+    def download(key):
+        return session.get(f"{server.url}/download", params={"key": key}).ok
+
+    def bundle(url):
+        return session.get(f"{server.url}/bundle", params={"template": url}).ok
+
+    urls = [rng.choice(templates)["url"] for _ in range(args.downloads)]
+    keys = [url.replace("template.yaml", "docker-compose.j2") for url in urls]
+
+    # The first pass fills the resolve cache; both passes are reported.
+    return {
+        "resolve_cold": measure(resolve, prompts, args.concurrency),
+        "resolve_warm": measure(resolve, prompts, args.concurrency),
+        "download": measure(download, keys, args.concurrency),
+        "bundle": measure(bundle, urls, args.concurrency),
+    }
+
+
+def bench_loader(server, templates, args, workdir):
+    loader.API_URL = f"{server.url}/resolve"
+    loader._session = None
+    template_cache.CACHE_DIR = os.path.join(workdir, "cache")
+    rng = random.Random(args.seed + 3)
+    # Full tag sets, so every prompt matches a template exactly.
+    sample = [
+        f"set up {' and '.join(rng.choice(templates)['tags'])}"
+        for _ in range(args.loader_prompts)
+    ]
+
+    def run(prompt):
+        loader.TEMPLATES_DIR = tempfile.mkdtemp(dir=workdir)
+        loader.download_template_logic(prompt)
+
+    # Cold runs download bundles, warm runs are served from the local cache.
+    return {
+        "cold": measure(run, sample, 1),
+        "warm": measure(run, sample, 1),
+    }
+
+
+def bench_size(size, args):
+    with tempfile.TemporaryDirectory(prefix=f"devlaunch-bench-{size}-") as workdir:
+        root = os.path.join(workdir, "bucket")
+        generated, templates = timed_call(
+            lambda: generate_catalog(root, size, args.seed)
+        )
+        prompts = generate_prompts(templates, args.requests, args.seed)
+        storage = LocalStorage(root)
+        result = {
+            "generate_seconds": round(generated, 4),
+            "indexer": bench_indexer(storage),
+        }
+
+        api.app.storage = storage
+        api.app._catalog = None
+        api.app.resolve_cache.clear()
+        loaded, _ = timed_call(api.app.warm_catalog)
+        result["catalog_load_seconds"] = round(loaded, 4)
+
+        api.app.start_catalog_refresher()
+        try:
+            with ApiServer() as server:
+                result.update(bench_api(server, templates, prompts, args))
+                result["loader"] = bench_loader(server, templates, args, workdir)
+        finally:
+            api.app.stop_catalog_refresher()
+        return result
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the devlaunch stack")
+    parser.add_argument(
+        "--sizes",
+        default=DEFAULT_SIZES,
+        help="comma-separated catalog sizes, e.g. 1000,10000,100000",
+    )
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--downloads", type=int, default=500)
+    parser.add_argument("--loader-prompts", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write results to this JSON file")
+    args = parser.parse_args(argv)
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+
+    results = {
+        "commit": git_commit(),
+        "created": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {
+            "requests": args.requests,
+            "downloads": args.downloads,
+            "loader_prompts": args.loader_prompts,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+        },
+        "sizes": {},
+    }
+    for size in [int(size) for size in args.sizes.split(",")]:
+        print(f"Benchmarking {size} templates...", file=sys.stderr)
+        results["sizes"][str(size)] = bench_size(size, args)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+        print(f"Results written to {args.output}", file=sys.stderr)
+    else:
+        print(output)
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+import math
+import random
+import threading
+import time
+
+import requests
+import yaml
+from requests.adapters import HTTPAdapter
+
+from devlaunch.loader import REQUEST_TIMEOUT, api_url
+
+ENDPOINTS = ("resolve", "batch", "download", "bundle")
+DEFAULT_MIX = "resolve=70,batch=5,download=15,bundle=10"
+BATCH_SIZE = 20
+DISCOVERY_PROMPTS = 200
+READ_CHUNK_SIZE = 64 * 1024
+
+
+# Nearest-rank percentile: the smallest value with at least `fraction` of the
+# samples at or below it.
+def percentile(ordered, fraction):
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(latencies, elapsed, errors=0):
+    count = len(latencies)
+    ordered = sorted(latencies)
+    return {
+        "requests": count + errors,
+        "errors": errors,
+        "elapsed": round(elapsed, 4),
+        "throughput": round(count / elapsed, 2) if elapsed else None,
+        "mean_ms": round(sum(ordered) / count * 1000, 3) if count else None,
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 3) if count else None,
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 3) if count else None,
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 3) if count else None,
+    }
+
+
+# "resolve=70,download=30" -> {"resolve": 70.0, "download": 30.0}
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.strip().partition("=")
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint '{name}', expected one of {ENDPOINTS}")
+        mix[name] = float(weight or 1)
+    if not any(weight > 0 for weight in mix.values()):
+        raise ValueError("The mix needs at least one endpoint with a weight above 0")
+    return mix
+
+
+def new_session(pool_size=1):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+# The tag list the indexer publishes is fetched through /download, so the
+# prompt mix follows whatever the deployed catalog actually contains.
+def load_tags(session, tags_file=None):
+    if tags_file:
+        with open(tags_file) as f:
+            tags = yaml.safe_load(f)
+    else:
+        response = session.get(
+            api_url("/download"), params={"key": "tags.yaml"}, timeout=REQUEST_TIMEOUT
+        )
+        if response.status_code != 200:
+            raise Exception(f"Could not fetch tags.yaml: HTTP {response.status_code}")
+        tags = yaml.safe_load(response.content)
+    if not tags:
+        raise Exception("tags.yaml has no tags to build prompts from")
+    return [str(tag) for tag in tags]
+
+
+def make_prompts(tags, count, rng):
+    return [
+        f"set up {' and '.join(rng.sample(tags, rng.randint(1, min(4, len(tags)))))}"
+        for _ in range(count)
+    ]
+
+
+# Resolves a sample of prompts once, up front, to learn which template URLs
+# and file keys exist for the /download and /bundle share of the mix.
+def discover_targets(session, prompts):
+    response = session.post(
+        api_url("/resolve/batch"),
+        json={"prompts": prompts[:DISCOVERY_PROMPTS]},
+        timeout=REQUEST_TIMEOUT,
+    )
+    if response.status_code != 200:
+        raise Exception(
+            f"Could not resolve sample prompts: HTTP {response.status_code}"
+        )
+
+    templates, files = set(), set()
+    for result in response.json()["results"]:
+        if result.get("matched"):
+            templates.add(result["matched"]["url"])
+            files.update(result.get("files") or [])
+        templates.update(c["template"]["url"] for c in result.get("candidates", []))
+    # Every template.yaml is itself a downloadable file.
+    files.update(templates)
+    return sorted(templates), sorted(files)
+
+
+def drain(response):
+    for _ in response.iter_content(READ_CHUNK_SIZE):
+        pass
+
+
+def send(session, endpoint, rng, prompts, templates, files):
+    if endpoint == "resolve":
+        response = session.post(
+            api_url("/resolve"),
+            json={"prompt": rng.choice(prompts)},
+            timeout=REQUEST_TIMEOUT,
+        )
+    elif endpoint == "batch":
+        response = session.post(
+            api_url("/resolve/batch"),
+            json={"prompts": rng.sample(prompts, min(BATCH_SIZE, len(prompts)))},
+            timeout=REQUEST_TIMEOUT,
+        )
+    elif endpoint == "download":
+        response = session.get(
+            api_url("/download"),
+            params={"key": rng.choice(files)},
+            stream=True,
+            timeout=REQUEST_TIMEOUT,
+        )
+        drain(response)
+    else:
+        response = session.get(
+            api_url("/bundle"),
+            params={"template": rng.choice(templates)},
+            stream=True,
+            timeout=REQUEST_TIMEOUT,
+        )
+        drain(response)
+    return response.status_code
+
+
+# Every worker thread has its own session and random stream and keeps one
+# request in flight until the deadline passes or `total` requests were sent.
+# Latencies are kept per endpoint; failed requests and non-2xx answers are
+# counted as errors and their status codes tallied.
+def run_load(
+    prompts,
+    templates,
+    files,
+    mix,
+    concurrency=8,
+    duration=30.0,
+    total=None,
+    seed=0,
+    session_factory=new_session,
+):
+    mix = dict(mix)
+    if not templates:
+        mix.pop("bundle", None)
+    if not files:
+        mix.pop("download", None)
+    if not any(weight > 0 for weight in mix.values()):
+        raise Exception("No endpoint in the mix can be exercised against this API")
+    names = list(mix)
+    weights = [mix[name] for name in names]
+
+    latencies = {name: [] for name in names}
+    errors = {name: 0 for name in names}
+    statuses = {name: {} for name in names}
+    lock = threading.Lock()
+    sent = 0
+    deadline = time.monotonic() + duration if total is None else None
+
+    def next_request():
+        nonlocal sent
+        with lock:
+            if total is not None and sent >= total:
+                return False
+            sent += 1
+        return deadline is None or time.monotonic() < deadline
+
+    def worker(index):
+        session = session_factory()
+        rng = random.Random(seed + index)
+        while next_request():
+            endpoint = rng.choices(names, weights)[0]
+            started = time.perf_counter()
+            try:
+                status = send(session, endpoint, rng, prompts, templates, files)
+            except requests.RequestException as e:
+                status = type(e).__name__
+            elapsed = time.perf_counter() - started
+            with lock:
+                statuses[endpoint][str(status)] = (
+                    statuses[endpoint].get(str(status), 0) + 1
+                )
+                if isinstance(status, int) and 200 <= status < 400:
+                    latencies[endpoint].append(elapsed)
+                else:
+                    errors[endpoint] += 1
+
+    started = time.perf_counter()
+    threads = [
+        threading.Thread(target=worker, args=(i,), daemon=True)
+        for i in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    report = {
+        name: dict(
+            summarize(latencies[name], elapsed, errors[name]), statuses=statuses[name]
+        )
+        for name in names
+        if latencies[name] or errors[name]
+    }
+    report["total"] = summarize(
+        [latency for name in names for latency in latencies[name]],
+        elapsed,
+        sum(errors.values()),
+    )
+    return report
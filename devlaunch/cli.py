@@ -1,12 +1,23 @@
 import typer
 import os
+import json
+import random
 import subprocess
+import sys
 import yaml
-from devlaunch.generator import generate_file, create_from_prompt
-from typing import List
+from devlaunch.generator import (
+    GENERATE_WORKERS,
+    generate_file,
+    generate_from_manifest,
+    create_from_prompt,
+)
+from typing import List, Optional
 from typing_extensions import Annotated
 from pathlib import Path
-from devlaunch.loader import download_template_logic
+from devlaunch.loader import download_template_logic, resolve_batch
+from devlaunch.templates.cache import TemplateCache
+from devlaunch.llm_cache import ResponseCache
+from devlaunch import bench
 
 
 app = typer.Typer(rich_markup_mode="rich")
@@ -50,8 +61,27 @@ def ls(show: str = typer.Option("all")):
 
 
 @app.command(help="🧱 Generate files from a specified template name")
-def generate(template: str):
-    generate_file(template)
+def generate(
+    template: Optional[str] = typer.Argument(None),
+    manifest: Optional[str] = typer.Option(
+        None, "--from", help="Render every project listed in this manifest file."
+    ),
+    workers: int = typer.Option(
+        GENERATE_WORKERS, "--workers", help="Projects rendered in parallel."
+    ),
+):
+    if manifest is None:
+        if template is None:
+            raise typer.BadParameter("Give a template name or --from <manifest>")
+        generate_file(template)
+        return
+
+    try:
+        paths = generate_from_manifest(manifest, workers)
+    except Exception as e:
+        typer.secho(f"[!] Error: {str(e)}", fg=typer.colors.RED)
+        raise typer.Exit(1)
+    typer.secho(f"[✔] Generated {len(paths)} project(s)", fg=typer.colors.GREEN)
 
 
 @app.command(
@@ -218,7 +248,11 @@ Suggested models to test (to be filled by you):
 ...and start generating scaffolds with AI!
 """
 )
-def prompt():
+def prompt(
+    no_cache: bool = typer.Option(
+        False, "--no-cache", help="Ask the LLM again instead of reusing an answer."
+    ),
+):
     user_input = input("🧠 What do you want to build?\n> ").strip()
     template = download_template_logic(user_input)
 
@@ -231,7 +265,7 @@ def prompt():
         print(f"\n❌ No matching template found for: '{user_input}'")
         confirm = input("🚀 Generate a new one locally? [y/N] ").strip().lower()
         if confirm == "y":
-            create_from_prompt(user_input)
+            create_from_prompt(user_input, use_cache=not no_cache)
             print("\n✅ Project generated.")
             print("👉 Use:")
             print(f"   devlaunch generate {template}")
@@ -286,11 +320,105 @@ def download(prompt: str):
         raise typer.Exit(1)
 
 
-@app.command(
-    help="🧹 Clean up generated files or temporary data (feature not implemented yet)"
-)
-def clean():
-    pass
+@app.command(help="🔎 Resolve many prompts at once (one prompt per line)")
+def resolve(
+    source: str = typer.Argument(
+        "-", help="File with one prompt per line, or '-' to read stdin."
+    ),
+    as_json: bool = typer.Option(
+        False, "--json", help="Print one JSON result per line."
+    ),
+    top_k: Optional[int] = typer.Option(
+        None, "--top-k", help="Ranked candidates per prompt."
+    ),
+):
+    if source == "-":
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(source) as f:
+            lines = f.read().splitlines()
+    prompts = [line.strip() for line in lines if line.strip()]
+
+    try:
+        results = resolve_batch(prompts, top_k)
+    except Exception as e:
+        typer.secho(f"[!] Error: {str(e)}", fg=typer.colors.RED)
+        raise typer.Exit(1)
+
+    for prompt, result in zip(prompts, results):
+        if as_json:
+            print(json.dumps({"prompt": prompt, **result}))
+            continue
+        matched = result.get("matched")
+        if matched:
+            print(f"✅ {prompt} -> {matched.get('url')}")
+        else:
+            print(f"❌ {prompt} -> no match")
+
+
+@app.command(help="🧹 Prune the local template download and LLM response caches")
+def clean(
+    everything: bool = typer.Option(False, "--all", help="Remove every cached file."),
+):
+    removed, freed = 0, 0
+    for cache in (TemplateCache(), ResponseCache()):
+        files, size = cache.clear() if everything else cache.prune()
+        removed += files
+        freed += size
+    typer.secho(
+        f"[✔] Removed {removed} cached file(s), freed {freed / 1024:.1f} KiB",
+        fg=typer.colors.GREEN,
+    )
+
+
+@app.command("bench-api", help="📈 Load-test the API and report latency percentiles")
+def bench_api(
+    concurrency: int = typer.Option(8, "--concurrency", "-c", help="Parallel clients."),
+    duration: float = typer.Option(30.0, "--duration", "-d", help="Seconds to run."),
+    total: Optional[int] = typer.Option(
+        None, "--requests", "-n", help="Stop after this many requests instead."
+    ),
+    mix: str = typer.Option(
+        bench.DEFAULT_MIX, "--mix", help="Endpoint weights, e.g. resolve=80,bundle=20."
+    ),
+    tags_file: Optional[str] = typer.Option(
+        None, "--tags-file", help="Build prompts from this tags.yaml, not the API's."
+    ),
+    seed: int = typer.Option(0, "--seed", help="Seed for the prompt and request mix."),
+    as_json: bool = typer.Option(False, "--json", help="Print the report as JSON."),
+):
+    try:
+        weights = bench.parse_mix(mix)
+    except ValueError as e:
+        raise typer.BadParameter(str(e), param_hint="--mix")
+
+    rng = random.Random(seed)
+    session = bench.new_session()
+    try:
+        prompts = bench.make_prompts(bench.load_tags(session, tags_file), 1000, rng)
+        templates, files = bench.discover_targets(session, prompts)
+        report = bench.run_load(
+            prompts, templates, files, weights, concurrency, duration, total, seed
+        )
+    except Exception as e:
+        typer.secho(f"[!] Error: {str(e)}", fg=typer.colors.RED)
+        raise typer.Exit(1)
+
+    if as_json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(
+        f"{'endpoint':<10} {'requests':>9} {'errors':>7} {'req/s':>9} "
+        f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+    )
+    for name, stats in report.items():
+        error_rate = stats["errors"] / stats["requests"] if stats["requests"] else 0
+        print(
+            f"{name:<10} {stats['requests']:>9} {error_rate:>7.1%} "
+            f"{stats['throughput'] or 0:>9.1f} {stats['p50_ms'] or 0:>9.2f} "
+            f"{stats['p95_ms'] or 0:>9.2f} {stats['p99_ms'] or 0:>9.2f}"
+        )
 
 
 if __name__ == "__main__":
@@ -1,12 +1,52 @@
 import os
+import shutil
+import tempfile
+import threading
 import yaml
-from jinja2 import Template
-from devlaunch.llm import query_llm
+from concurrent.futures import ThreadPoolExecutor
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+from devlaunch.llm import METADATA_SEPARATOR, query_llm
+from devlaunch.templates import cache
+from devlaunch.templates.schema import is_template_file, template_schema
+from devlaunch.utils import atomic_open
 
 
 TEMPLATES_DIR = os.path.join(os.getcwd(), "templates", "scaffolds")
 PROJECTS_DIR = os.path.join(os.getcwd(), "projects")
 
+# Compiled templates stay in memory for the life of the process; their
+# bytecode is also kept on disk so later runs skip compilation as well.
+TEMPLATE_CACHE_SIZE = 400
+
+GENERATE_WORKERS = 8
+
+# Template metadata, not part of the generated project.
+CONFIG_FILE = "template.yaml"
+# Output names that do not follow the "strip the .j2 suffix" rule.
+RENDERED_NAMES = {"docker-compose.j2": "docker-compose.yml"}
+
+_environment = None
+_environment_lock = threading.Lock()
+
+
+def bytecode_cache_dir():
+    return os.path.join(cache.CACHE_DIR, "jinja")
+
+
+# One Environment per templates directory. Template names are paths relative
+# to TEMPLATES_DIR, so scaffolds can include or extend each other's files.
+def get_environment() -> Environment:
+    global _environment
+    with _environment_lock:
+        if _environment is None or _environment.loader.searchpath != [TEMPLATES_DIR]:
+            os.makedirs(bytecode_cache_dir(), exist_ok=True)
+            _environment = Environment(
+                loader=FileSystemLoader(TEMPLATES_DIR),
+                bytecode_cache=FileSystemBytecodeCache(bytecode_cache_dir()),
+                cache_size=TEMPLATE_CACHE_SIZE,
+            )
+        return _environment
+
 
 def load_template_config(template_dir):
     config_path = os.path.join(template_dir, "template.yaml")
@@ -14,14 +54,29 @@ def load_template_config(template_dir):
         return yaml.safe_load(f)
 
 
-def prompt_for_values(required_inputs):
+def prompt_for_values(required_inputs, optional_inputs=()):
     data = {}
     for field in required_inputs:
         value = input(f"{field}: ")
         data[field] = value
+    # Left out when skipped, so the template's own defaults still apply.
+    for field in optional_inputs:
+        value = input(f"{field} (optional): ")
+        if value:
+            data[field] = value
     return data
 
 
+# Same analysis the indexer records in the index, run on a local copy.
+def load_template_schema(template_dir):
+    sources = {}
+    for path in walk_files(template_dir):
+        if is_template_file(path):
+            with open(path, encoding="utf-8", errors="replace") as f:
+                sources[os.path.relpath(path, template_dir)] = f.read()
+    return template_schema(sources)
+
+
 def generate_file(template: str):
     template_dir = os.path.join(TEMPLATES_DIR, template)
 
@@ -30,35 +85,192 @@ def generate_file(template: str):
         return
 
     config = load_template_config(template_dir)
+    schema = load_template_schema(template_dir)
+    if not schema["valid"]:
+        print(f"[!] Template '{template}' has errors:")
+        for error in schema["errors"]:
+            print(f"    {error}")
+        return
+
     required_inputs = config.get("required_inputs", [])
-    variables = prompt_for_values(required_inputs)
+    optional_inputs = [
+        name for name in schema["variables"] if name not in required_inputs
+    ]
+    variables = prompt_for_values(required_inputs, optional_inputs)
 
     project_name = input("Project name: ").strip()
+    written = render_project(template, project_name, variables)
+
     output_dir = os.path.join(PROJECTS_DIR, project_name)
-    os.makedirs(output_dir, exist_ok=True)
+    print(f"[+] Generated {len(written)} file(s) in: {output_dir}")
 
-    j2_path = os.path.join(template_dir, "docker-compose.j2")
-    with open(j2_path) as f:
-        template_content = f.read()
 
-    rendered = Template(template_content).render(**variables)
+def walk_files(path):
+    for entry in os.scandir(path):
+        if entry.is_dir():
+            yield from walk_files(entry.path)
+        elif entry.is_file():
+            yield entry.path
+
+
+def output_name(name: str) -> str:
+    if name in RENDERED_NAMES:
+        return RENDERED_NAMES[name]
+    return name[: -len(".j2")] if name.endswith(".j2") else name
+
+
+# Jinja yields the output in pieces as it renders, and each piece goes
+# straight to the file, so large outputs are never held as one string.
+def render_to_file(name: str, variables, output_path: str):
+    stream = get_environment().get_template(name).generate(**variables)
+    with atomic_open(output_path, "w") as f:
+        f.writelines(stream)
+
+
+# shutil.copyfile hands the copy to the kernel (sendfile/copy_file_range),
+# so file data never passes through Python. Hard links would be cheaper
+# still, but an in-place edit of the project file would then change the
+# scaffold as well.
+def copy_static(source: str, output_path: str):
+    directory = os.path.dirname(output_path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    os.close(fd)
+    try:
+        shutil.copyfile(source, tmp_path)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+# Every file of the template directory ends up in the project: .j2 files are
+# rendered, everything else is copied as is, with the original permissions.
+# Returns the paths written.
+def render_project(template: str, project_name: str, variables):
+    template_dir = os.path.join(TEMPLATES_DIR, template)
+    output_dir = os.path.join(PROJECTS_DIR, project_name)
+    written = []
+    for source in sorted(walk_files(template_dir)):
+        relative = os.path.relpath(source, template_dir)
+        if relative == CONFIG_FILE:
+            continue
+        directory, name = os.path.split(relative)
+        output_path = os.path.join(output_dir, directory, output_name(name))
+        if name.endswith(".j2"):
+            name = "/".join([template, *relative.split(os.sep)])
+            render_to_file(name, variables, output_path)
+        else:
+            copy_static(source, output_path)
+        shutil.copymode(source, output_path)
+        written.append(output_path)
+    return written
+
+
+# A manifest lists many projects to render without prompting:
+#
+#   variables:              # optional, shared by every project
+#     POSTGRES_USER: app
+#   projects:
+#     - template: postgres
+#       project: billing-db
+#       variables:
+#         POSTGRES_DB: billing
+#
+# Every entry is checked first; nothing is written unless all of them are
+# valid. Returns (template, project, variables) tuples ready to render.
+def load_manifest(path: str):
+    with open(path) as f:
+        manifest = yaml.safe_load(f) or {}
+    if isinstance(manifest, list):
+        manifest = {"projects": manifest}
+
+    defaults = manifest.get("variables") or {}
+    configs = {}
+    projects = []
+    seen = set()
+    errors = []
+    for number, entry in enumerate(manifest.get("projects") or [], 1):
+        if not isinstance(entry, dict):
+            errors.append(f"entry {number}: expected a mapping")
+            continue
+        template = str(entry.get("template") or "")
+        project = str(entry.get("project") or "")
+        variables = {**defaults, **(entry.get("variables") or {})}
+        where = f"entry {number} ({project or template or '?'})"
+
+        if not template or not project:
+            errors.append(f"{where}: 'template' and 'project' are required")
+            continue
+        if os.path.basename(project) != project or project in (".", ".."):
+            errors.append(f"{where}: project must be a plain directory name")
+            continue
+        if project in seen:
+            errors.append(f"{where}: project '{project}' is listed twice")
+            continue
+        seen.add(project)
+
+        if template not in configs:
+            template_dir = os.path.join(TEMPLATES_DIR, template)
+            configs[template] = (
+                (load_template_config(template_dir), load_template_schema(template_dir))
+                if os.path.exists(os.path.join(template_dir, "template.yaml"))
+                else (None, None)
+            )
+        config, schema = configs[template]
+        if config is None:
+            errors.append(f"{where}: template '{template}' not found")
+            continue
+        if not schema["valid"]:
+            errors.append(
+                f"{where}: template has errors: {'; '.join(schema['errors'])}"
+            )
+            continue
+
+        missing = [
+            field
+            for field in config.get("required_inputs") or []
+            if field not in variables
+        ]
+        if missing:
+            errors.append(f"{where}: missing {', '.join(missing)}")
+            continue
+        projects.append((template, project, variables))
+
+    if errors:
+        raise Exception("Invalid manifest:\n  - " + "\n  - ".join(errors))
+    if not projects:
+        raise Exception("The manifest lists no projects.")
+    return projects
 
-    output_path = os.path.join(output_dir, "docker-compose.yml")
-    with open(output_path, "w") as f:
-        f.write(rendered)
 
-    print(f"[+] Generated docker-compose.yml at: {output_path}")
+# Renders every project in the manifest on a thread pool. The compiled
+# templates are shared by all workers, and each output file is written
+# atomically, so an interrupted run never leaves half-written files.
+# Returns the output directory of every project.
+def generate_from_manifest(path: str, workers: int = GENERATE_WORKERS):
+    projects = load_manifest(path)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(render_project, *project) for project in projects]
+        for future in futures:
+            future.result()
+    return [os.path.join(PROJECTS_DIR, project) for _, project, _ in projects]
 
 
-def create_from_prompt(prompt: str):
-    response = query_llm(prompt)
-    print("📝 Raw output:\n", response)
+def create_from_prompt(prompt: str, use_cache: bool = True):
+    print("📝 Raw output:")
+    response = query_llm(
+        prompt,
+        use_cache=use_cache,
+        on_text=lambda text: print(text, end="", flush=True),
+    )
+    print()
 
-    if "---END_METADATA---" not in response:
+    if METADATA_SEPARATOR not in response:
         print("❌ LLM response missing metadata separator.")
         return
 
-    template_part, metadata_part = response.split("---END_METADATA---", 1)
+    template_part, metadata_part = response.split(METADATA_SEPARATOR, 1)
 
     try:
         metadata = yaml.safe_load(metadata_part)
@@ -1,8 +1,12 @@
 # llm.py
+import json
 import yaml
 from pathlib import Path
 import requests
 import subprocess
+from functools import partial
+
+from devlaunch.llm_cache import ResponseCache, response_key
 
 # CONFIG_PATH = Path.home() / ".llm_config.yaml"
 
@@ -32,6 +36,9 @@ Only return these two things. Do not explain anything. Do not include extra text
 Do NOT use Markdown formatting. Do NOT use ```yaml or ``` or horizontal lines (---).
 Return plain text only."""
 
+METADATA_SEPARATOR = "---END_METADATA---"
+METADATA_KEYS = ("description", "required_inputs")
+
 
 def load_config():
     if CONFIG_PATH.exists():
@@ -40,7 +47,118 @@ def load_config():
     return {}
 
 
-def query_openrouter(prompt: str, api_key: str, model: str) -> str:
+def last_key(block):
+    for line in reversed(block.splitlines()):
+        if line and line[0] not in " \t-" and ":" in line:
+            return line.partition(":")[0].strip()
+    return None
+
+
+# Complete once every METADATA_KEYS key, and the key written last, has a
+# value. "required_inputs:" alone is not complete, since its items may still
+# follow after a blank line.
+def metadata_complete(block):
+    try:
+        metadata = yaml.safe_load(block)
+    except yaml.YAMLError:
+        return False
+    if not isinstance(metadata, dict):
+        return False
+    keys = METADATA_KEYS + (last_key(block),)
+    return all(metadata.get(key) is not None for key in keys)
+
+
+# Blank lines and lines that can't continue a YAML mapping (prose, fences,
+# "---") close the metadata block.
+def continues_metadata(line):
+    if not line.strip():
+        return False
+    if line[0] in " \t-":
+        return True
+    key, colon, _ = line.partition(":")
+    return bool(colon) and key.strip().replace("_", "").isalnum()
+
+
+# Accumulates a streamed completion. Text up to METADATA_SEPARATOR is handed
+# to on_text as it arrives; after it only whole lines are, so the metadata
+# block can be checked line by line. feed() returns True once the block has
+# every METADATA_KEYS key and is followed by a line that closes it. Whatever
+# the model writes after that is dropped and generation can be stopped.
+class CompletionStream:
+    def __init__(self, on_text=None):
+        self.text = ""
+        self.shown = 0
+        self.metadata_start = None
+        self.on_text = on_text
+
+    def show(self, end):
+        if end > self.shown:
+            if self.on_text:
+                self.on_text(self.text[self.shown : end])
+            self.shown = end
+
+    def feed(self, chunk):
+        self.text += chunk
+        if self.metadata_start is None:
+            separator = self.text.find(METADATA_SEPARATOR)
+            if separator == -1:
+                self.show(len(self.text))
+                return False
+            self.metadata_start = separator + len(METADATA_SEPARATOR)
+            self.show(self.metadata_start)
+
+        while True:
+            newline = self.text.find("\n", self.shown)
+            if newline == -1:
+                return False
+            if self.closes_metadata(self.text[self.shown : newline]):
+                self.text = self.text[: self.shown]
+                return True
+            self.show(newline + 1)
+
+    def closes_metadata(self, line):
+        block = self.text[self.metadata_start : self.shown]
+        return not continues_metadata(line) and metadata_complete(block)
+
+    # A trailing partial line is dropped too if it would have closed the block.
+    def finish(self):
+        tail = self.text[self.shown :]
+        if self.metadata_start is not None and tail and self.closes_metadata(tail):
+            self.text = self.text[: self.shown]
+        self.show(len(self.text))
+        return self.text.strip()
+
+
+# Feeds text chunks into a CompletionStream and closes the response as soon
+# as the metadata is complete, which ends the generation on the provider side.
+def read_stream(response, chunks, on_text=None):
+    stream = CompletionStream(on_text)
+    with response:
+        for chunk in chunks:
+            if stream.feed(chunk):
+                break
+    return stream.finish()
+
+
+# OpenRouter streams server-sent events: "data: {json}" lines carrying
+# choices[0].delta.content, ": ..." keep-alive comments and "data: [DONE]".
+def openrouter_chunks(response):
+    for line in response.iter_lines():
+        line = line.decode("utf-8")
+        if not line.startswith("data:"):
+            continue
+        data = line[len("data:") :].strip()
+        if data == "[DONE]":
+            return
+        event = json.loads(data)
+        if "error" in event:
+            raise Exception(f"❌ OpenRouter error: {event['error'].get('message')}")
+        content = event["choices"][0].get("delta", {}).get("content")
+        if content:
+            yield content
+
+
+def query_openrouter(prompt: str, api_key: str, model: str, on_text=None) -> str:
     url = "https://openrouter.ai/api/v1/chat/completions"
     headers = {
         "Authorization": f"Bearer {api_key}",
@@ -54,11 +172,12 @@ def query_openrouter(prompt: str, api_key: str, model: str) -> str:
             {"role": "system", "content": SYSTEM_PROMPT},
             {"role": "user", "content": prompt},
         ],
+        "stream": True,
     }
 
-    response = requests.post(url, json=body, headers=headers)
+    response = requests.post(url, json=body, headers=headers, stream=True)
     response.raise_for_status()
-    return response.json()["choices"][0]["message"]["content"].strip()
+    return read_stream(response, openrouter_chunks(response), on_text)
 
 
 def check_ollama_installed():
@@ -69,17 +188,39 @@ def check_ollama_installed():
         return False
 
 
-def query_local(prompt: str, model: str, url: str) -> str:
+# Ollama streams newline-delimited JSON objects with a "response" fragment
+# each; the last one has "done": true.
+def ollama_chunks(response):
+    for line in response.iter_lines():
+        if not line:
+            continue
+        event = json.loads(line)
+        if event.get("error"):
+            raise Exception(f"❌ Ollama error: {event['error']}")
+        if event.get("response"):
+            yield event["response"]
+        if event.get("done"):
+            return
+
+
+def query_local(prompt: str, model: str, url: str, on_text=None) -> str:
     full_prompt = f"{SYSTEM_PROMPT}\nUser: {prompt}"
 
-    payload = {"model": model, "prompt": full_prompt, "stream": False}
+    payload = {"model": model, "prompt": full_prompt, "stream": True}
+
+    response = requests.post(url, json=payload, stream=True)
+    return read_stream(response, ollama_chunks(response), on_text)
+
 
-    response = requests.post(url, json=payload)
-    data = response.json()
-    return data.get("response", "").strip()
+# Ollama only has to be installed when a prompt actually reaches it, so a
+# cached answer is served without it.
+def query_installed_local(prompt, model, url, on_text=None):
+    if not check_ollama_installed():
+        raise Exception("❌ Ollama is not installed. Please install it first.")
+    return query_local(prompt, model, url, on_text)
 
 
-def query_llm(prompt: str) -> str:
+def query_llm(prompt: str, use_cache: bool = True, on_text=None) -> str:
     config = load_config()
     provider = config.get("llm_config")
 
@@ -91,7 +232,7 @@ def query_llm(prompt: str) -> str:
         if not api_key:
             raise Exception("❌ No OpenAI API key found in config.")
         model = config.get("openrouter_model", "openai/gpt-3.5-turbo")
-        return query_openrouter(prompt, api_key, model)
+        query = partial(query_openrouter, prompt, api_key, model, on_text)
 
     elif provider == "local":
         model = config.get("local_model")
@@ -100,9 +241,32 @@ def query_llm(prompt: str) -> str:
         url = config.get("ollama_url")
         if not url:
             raise Exception("❌ No local url specified in config (ollama_url).")
-        if not check_ollama_installed():
-            raise Exception("❌ Ollama is not installed. Please install it first.")
-        return query_local(prompt, model, url)
+        query = partial(query_installed_local, prompt, model, url, on_text)
 
     else:
         raise Exception(f"❌ Unknown LLM provider: {provider}")
+
+    return cached_query(prompt, provider, model, query, use_cache, on_text)
+
+
+# Serves repeated prompts from the response cache. use_cache=False skips the
+# lookup but still stores the fresh answer, so a retry replaces a bad one.
+# Answers without the metadata separator are never cached. A cached answer
+# is handed to on_text in one piece.
+def cached_query(prompt, provider, model, query, use_cache=True, on_text=None):
+    cache = ResponseCache()
+    key = response_key(prompt, provider, model, SYSTEM_PROMPT)
+    if use_cache:
+        response = cache.get(key)
+        if response is not None:
+            if on_text:
+                on_text(response)
+            return response
+
+    response = query()
+    if METADATA_SEPARATOR in response:
+        try:
+            cache.put(key, response, provider=provider, model=model)
+        except OSError:
+            pass
+    return response
@@ -0,0 +1,91 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from devlaunch.templates import cache as template_cache
+from devlaunch.utils import atomic_open
+
+MAX_RESPONSE_CACHE_SIZE = int(
+    os.environ.get("DEVLAUNCH_LLM_CACHE_MAX_BYTES", 16 * 1024 * 1024)
+)
+RESPONSE_CACHE_TTL = int(os.environ.get("DEVLAUNCH_LLM_CACHE_TTL", 30 * 24 * 3600))
+
+
+# Case and runs of whitespace don't change what the model is asked for.
+def normalize_prompt(prompt):
+    return " ".join(prompt.split()).casefold()
+
+
+# The system prompt is part of the key, so editing it invalidates every
+# answer that was produced under the old instructions.
+def response_key(prompt, provider, model, system_prompt):
+    system_hash = hashlib.sha256(system_prompt.encode()).hexdigest()
+    material = json.dumps([provider, model, system_hash, normalize_prompt(prompt)])
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+# On-disk cache of LLM completions, one JSON file per key under
+# <cache dir>/llm. An entry's mtime is its creation time: entries older than
+# the TTL are ignored and pruned, and the oldest go first when the cache
+# outgrows max_size.
+class ResponseCache:
+    def __init__(self, root=None, max_size=None, ttl=None):
+        self.root = Path(root or Path(template_cache.CACHE_DIR) / "llm")
+        self.max_size = MAX_RESPONSE_CACHE_SIZE if max_size is None else max_size
+        self.ttl = RESPONSE_CACHE_TTL if ttl is None else ttl
+        self.lock = threading.Lock()
+
+    def path(self, key):
+        return self.root / f"{key}.json"
+
+    def get(self, key):
+        path = self.path(key)
+        try:
+            if time.time() - path.stat().st_mtime > self.ttl:
+                return None
+            with open(path) as f:
+                return json.load(f)["response"]
+        except (FileNotFoundError, ValueError, KeyError):
+            return None
+
+    def put(self, key, response, **details):
+        entry = dict(details, response=response, created=time.time())
+        with atomic_open(str(self.path(key)), "w") as f:
+            json.dump(entry, f)
+        self.prune()
+
+    def prune(self, max_size=None):
+        max_size = self.max_size if max_size is None else max_size
+        removed = 0
+        freed = 0
+        if not self.root.is_dir():
+            return removed, freed
+
+        with self.lock:
+            now = time.time()
+            entries = []
+            for entry in os.scandir(self.root):
+                if not entry.name.endswith(".json"):
+                    continue
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+            entries.sort()
+            total = sum(size for _, size, _ in entries)
+
+            for mtime, size, path in entries:
+                if total <= max_size and now - mtime <= self.ttl:
+                    continue
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    continue
+                total -= size
+                freed += size
+                removed += 1
+        return removed, freed
+
+    def clear(self):
+        return self.prune(max_size=0)
@@ -1,14 +1,186 @@
+import hashlib
 import os
+import tarfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
-from urllib.parse import urljoin
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from devlaunch.templates.cache import TemplateCache
+from devlaunch.utils import atomic_open
 
 API_URL = "http://ip-adress-of-ec2:5000/resolve"
 TEMPLATES_DIR = os.path.join(os.getcwd(), "templates", "scaffolds")
 BUCKET_NAME = "devlaunch-templates-bucket"
 
+DOWNLOAD_WORKERS = 8
+DOWNLOAD_RETRIES = 3
+DOWNLOAD_BACKOFF = 0.5
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+RESOLVE_BATCH_SIZE = 1000
+REQUEST_TIMEOUT = (5, 60)
+
+_session = None
+
+
+# One session per process: connections to the API are kept alive and shared
+# by all download workers, and failed requests are retried with backoff.
+# Once the retries run out the last response is returned rather than raised,
+# so callers can show the API's own error message.
+def get_session() -> requests.Session:
+    global _session
+    if _session is None:
+        retry = Retry(
+            total=DOWNLOAD_RETRIES,
+            backoff_factor=DOWNLOAD_BACKOFF,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset({"GET", "POST"}),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_maxsize=DOWNLOAD_WORKERS, max_retries=retry)
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        _session = session
+    return _session
+
+
+def api_url(path: str) -> str:
+    return f"{API_URL.replace('/resolve', '')}{path}"
+
+
+# Resolves many prompts with one /resolve/batch call per RESOLVE_BATCH_SIZE
+# prompts; results come back in prompt order.
+def resolve_batch(prompts, top_k=None):
+    results = []
+    for start in range(0, len(prompts), RESOLVE_BATCH_SIZE):
+        payload = {"prompts": prompts[start : start + RESOLVE_BATCH_SIZE]}
+        if top_k is not None:
+            payload["top_k"] = top_k
+        response = get_session().post(
+            api_url("/resolve/batch"), json=payload, timeout=REQUEST_TIMEOUT
+        )
+        if response.status_code != 200:
+            raise Exception(response.json().get("error", "Unknown error"))
+        results.extend(response.json()["results"])
+    return results
+
+
+def write_verified(chunks, local_path: str, sha256=None):
+    digest = hashlib.sha256()
+    with atomic_open(local_path) as f:
+        for chunk in chunks:
+            digest.update(chunk)
+            f.write(chunk)
+        if sha256 and digest.hexdigest() != sha256:
+            raise Exception(f"Checksum mismatch for: {local_path}")
+    return digest.hexdigest()
+
+
+def download_bundle(template_url: str, local_dir: str, hashes, cache) -> bool:
+    headers = {}
+    cached = cache.lookup_template(template_url)
+    if cached and cached.get("bundle_etag"):
+        headers["If-None-Match"] = cached["bundle_etag"]
+
+    response = get_session().get(
+        api_url("/bundle"),
+        params={"template": template_url},
+        headers=headers,
+        stream=True,
+        timeout=REQUEST_TIMEOUT,
+    )
+    with response:
+        if response.status_code == 404:
+            # Older API without /bundle: fall back to per-file downloads.
+            return False
+        if response.status_code == 304:
+            for relative_path, digest in cached["files"].items():
+                cache.materialize(digest, os.path.join(local_dir, relative_path))
+            return True
+        if response.status_code != 200:
+            raise Exception(f"Failed to download bundle for: {template_url}")
+
+        files = {}
+        with tarfile.open(fileobj=response.raw, mode="r|gz") as tar:
+            for member in tar:
+                member = tarfile.data_filter(member, local_dir)
+                if not member.isfile():
+                    continue
+                source = tar.extractfile(member)
+                chunks = iter(lambda: source.read(DOWNLOAD_CHUNK_SIZE), b"")
+                local_path = os.path.join(local_dir, member.name)
+                digest = write_verified(chunks, local_path, hashes.get(member.name))
+                cache.store(local_path, digest)
+                files[member.name] = digest
+
+        cache.remember_template(template_url, files, response.headers.get("ETag"))
+    return True
+
+
+# Failed connects and retryable statuses are already retried by the
+# session's adapter, so errors from get() are final. A connection that drops
+# while the body is being read is past the adapter's reach and gets this
+# loop's retries instead.
+def download_file(file_key: str, local_path: str, sha256, cache):
+    headers = {}
+    cached = cache.lookup_key(file_key)
+    if cached and sha256 in (None, cached["blob"]):
+        headers["If-None-Match"] = cached["etag"]
+
+    for attempt in range(DOWNLOAD_RETRIES + 1):
+        if attempt:
+            time.sleep(DOWNLOAD_BACKOFF * 2 ** (attempt - 1))
+        response = get_session().get(
+            api_url("/download"),
+            params={"key": file_key},
+            headers=headers,
+            stream=True,
+            timeout=REQUEST_TIMEOUT,
+        )
+        with response:
+            if response.status_code == 304:
+                cache.materialize(cached["blob"], local_path)
+                return
+            if response.status_code != 200:
+                raise Exception(f"Failed to download: {file_key}")
+            try:
+                digest = write_verified(
+                    response.iter_content(DOWNLOAD_CHUNK_SIZE), local_path, sha256
+                )
+            except requests.RequestException:
+                if attempt == DOWNLOAD_RETRIES:
+                    raise
+                continue
+            cache.store(local_path, digest)
+            cache.remember_key(file_key, response.headers.get("ETag"), digest)
+        return
+
+
+def download_files(files, prefix: str, local_dir: str, hashes, cache):
+    jobs = []
+    for file_key in files:
+        if not file_key.startswith(prefix):
+            raise Exception(f"Unexpected file key format: {file_key}")
+        relative_path = file_key[len(prefix):]
+        local_path = os.path.join(local_dir, relative_path)
+        jobs.append((file_key, local_path, hashes.get(relative_path), cache))
+
+    if not jobs:
+        return
+
+    with ThreadPoolExecutor(max_workers=min(DOWNLOAD_WORKERS, len(jobs))) as pool:
+        futures = [pool.submit(download_file, *job) for job in jobs]
+        for future in futures:
+            future.result()
+
 
 def download_template_logic(prompt: str) -> str:
-    response = requests.post(API_URL, json={"prompt": prompt})
+    response = get_session().post(
+        API_URL, json={"prompt": prompt}, timeout=REQUEST_TIMEOUT
+    )
     if response.status_code != 200:
         raise Exception(response.json().get("error", "Unknown error"))
 
@@ -19,6 +191,11 @@ def download_template_logic(prompt: str) -> str:
         raise Exception("No template matched your prompt.")
 
     template_url = matched.get("url", "")
+    if matched.get("valid") is False:
+        raise Exception(
+            f"Template '{template_url}' failed validation when it was indexed: "
+            + "; ".join(matched.get("errors", []))
+        )
     template_name = matched.get("name")
     if not template_name:
         template_name = os.path.dirname(template_url.rstrip("/"))
@@ -32,20 +209,30 @@ def download_template_logic(prompt: str) -> str:
     if not prefix.endswith("/"):
         prefix += "/"
 
-    for file_key in files:
-        if not file_key.startswith(prefix):
-            raise Exception(f"Unexpected file key format: {file_key}")
-        relative_path = file_key[len(prefix):]
-        local_path = os.path.join(local_dir, relative_path)
-        os.makedirs(os.path.dirname(local_path), exist_ok=True)
-
-        file_url = f"{API_URL.replace('/resolve', '')}/download?key={file_key}"
+    # Relative path -> SHA-256, when the index carries file manifests.
+    hashes = {
+        item["key"][len(prefix):]: item.get("sha256")
+        for item in data.get("manifest") or []
+        if item["key"].startswith(prefix)
+    }
 
-        file_resp = requests.get(file_url)
-        if file_resp.status_code == 200:
-            with open(local_path, "wb") as f:
-                f.write(file_resp.content)
+    # Files whose content hash is already in the local cache are copied from
+    # it; a fully cached template costs nothing beyond the /resolve call.
+    cache = TemplateCache()
+    missing = []
+    for file_key in files:
+        digest = hashes.get(file_key[len(prefix):])
+        if cache.has(digest):
+            cache.materialize(digest, os.path.join(local_dir, file_key[len(prefix):]))
         else:
-            raise Exception(f"Failed to download: {relative_path}")
+            missing.append(file_key)
+
+    try:
+        if len(missing) < len(files):
+            download_files(missing, prefix, local_dir, hashes, cache)
+        elif not download_bundle(template_url, local_dir, hashes, cache):
+            download_files(files, prefix, local_dir, hashes, cache)
+    finally:
+        cache.prune()
 
     return local_dir
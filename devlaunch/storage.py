@@ -0,0 +1,271 @@
+import mmap
+import os
+from datetime import datetime, timezone
+
+from devlaunch.utils import atomic_open
+
+# Backends return S3-shaped dicts ("Body", "ETag", "ContentLength",
+# "ContentRange", "LastModified" for objects; "Key", "Size", "ETag",
+# "LastModified" for listings) so callers do not care where data lives.
+
+LIST_PAGE_SIZE = 1000
+READ_CHUNK_SIZE = 64 * 1024
+
+
+class StorageError(Exception):
+    pass
+
+
+class NotFound(StorageError):
+    pass
+
+
+class NotModified(StorageError):
+    pass
+
+
+class InvalidRange(StorageError):
+    pass
+
+
+class S3Storage:
+    def __init__(
+        self,
+        bucket,
+        client=None,
+        max_pool_connections=10,
+        connect_timeout=5,
+        read_timeout=30,
+    ):
+        self.bucket = bucket
+        if client is None:
+            import boto3
+
+            client = boto3.client(
+                "s3",
+                config=boto3.session.Config(
+                    max_pool_connections=max_pool_connections,
+                    connect_timeout=connect_timeout,
+                    read_timeout=read_timeout,
+                    retries={"mode": "adaptive"},
+                ),
+            )
+        self.client = client
+
+    def get(self, key, if_none_match=None, byte_range=None):
+        params = {"Bucket": self.bucket, "Key": key}
+        if if_none_match:
+            params["IfNoneMatch"] = if_none_match
+        if byte_range:
+            params["Range"] = byte_range
+
+        try:
+            return self.client.get_object(**params)
+        except self.client.exceptions.NoSuchKey as e:
+            raise NotFound(key) from e
+        except self.client.exceptions.ClientError as e:
+            response = getattr(e, "response", None) or {}
+            status = response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+            code = response.get("Error", {}).get("Code")
+            if status == 304 or code in ("304", "NotModified"):
+                raise NotModified(key) from e
+            if code == "InvalidRange":
+                raise InvalidRange(key) from e
+            if code in ("NoSuchKey", "404"):
+                raise NotFound(key) from e
+            raise
+
+    def read(self, key):
+        return self.get(key)["Body"].read()
+
+    def list(self, prefix=""):
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            yield page.get("Contents", [])
+
+    def put(self, key, body):
+        self.client.put_object(Bucket=self.bucket, Key=key, Body=body)
+
+    def upload(self, key, fileobj):
+        self.client.upload_fileobj(fileobj, self.bucket, key)
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    def local_path(self, key):
+        return None
+
+
+# Reads through mmap, so chunks are sliced straight out of the page cache.
+class LocalBody:
+    def __init__(self, path, start=0, length=None):
+        self.file = open(path, "rb")
+        size = os.fstat(self.file.fileno()).st_size
+        self.map = (
+            mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        )
+        self.position = start
+        self.end = size if length is None else start + length
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self.end - self.position
+        data = self.map[self.position : min(self.position + size, self.end)]
+        self.position += len(data)
+        return bytes(data)
+
+    def iter_chunks(self, chunk_size=READ_CHUNK_SIZE):
+        while self.position < self.end:
+            yield self.read(chunk_size)
+
+    def close(self):
+        if isinstance(self.map, mmap.mmap):
+            self.map.close()
+        self.file.close()
+
+
+def parse_byte_range(byte_range, size):
+    unit, _, spec = byte_range.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        raise InvalidRange(byte_range)
+    first, _, last = spec.strip().partition("-")
+    if first:
+        start = int(first)
+        end = int(last) if last else size - 1
+    elif last:
+        start = max(size - int(last), 0)
+        end = size - 1
+    else:
+        raise InvalidRange(byte_range)
+    end = min(end, size - 1)
+    if start > end:
+        raise InvalidRange(byte_range)
+    return start, end
+
+
+# Serves a directory laid out like the bucket, for on-prem and air-gapped
+# deployments and for benchmarks that should not depend on AWS.
+class LocalStorage:
+    def __init__(self, root):
+        self.root = os.path.realpath(root)
+
+    def local_path(self, key):
+        path = os.path.realpath(os.path.join(self.root, key))
+        if path != self.root and not path.startswith(self.root + os.sep):
+            raise NotFound(key)
+        return path
+
+    def stat(self, key):
+        try:
+            return os.stat(self.local_path(key))
+        except (FileNotFoundError, NotADirectoryError) as e:
+            raise NotFound(key) from e
+
+    @staticmethod
+    def etag(st):
+        return f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+
+    def get(self, key, if_none_match=None, byte_range=None):
+        st = self.stat(key)
+        etag = self.etag(st)
+        if if_none_match and (
+            if_none_match.strip() == "*"
+            or etag in [tag.strip() for tag in if_none_match.split(",")]
+        ):
+            raise NotModified(key)
+
+        obj = {
+            "ETag": etag,
+            "LastModified": datetime.fromtimestamp(st.st_mtime, tz=timezone.utc),
+            "ContentLength": st.st_size,
+        }
+        if byte_range:
+            try:
+                start, end = parse_byte_range(byte_range, st.st_size)
+            except ValueError as e:
+                raise InvalidRange(byte_range) from e
+            obj["ContentLength"] = end - start + 1
+            obj["ContentRange"] = f"bytes {start}-{end}/{st.st_size}"
+            obj["Body"] = LocalBody(self.local_path(key), start, end - start + 1)
+        else:
+            obj["Body"] = LocalBody(self.local_path(key))
+        return obj
+
+    def read(self, key):
+        self.stat(key)
+        with open(self.local_path(key), "rb") as f:
+            return f.read()
+
+    def walk(self, path):
+        for entry in os.scandir(path):
+            if entry.is_dir(follow_symlinks=False):
+                yield from self.walk(entry.path)
+            elif entry.is_file() and not entry.name.startswith(".tmp-"):
+                yield entry
+
+    # Keys come back sorted and in pages, like list_objects_v2.
+    def list(self, prefix=""):
+        base = os.path.dirname(prefix)
+        start = self.local_path(base) if base else self.root
+        if not os.path.isdir(start):
+            return
+
+        objects = []
+        for entry in self.walk(start):
+            key = os.path.relpath(entry.path, self.root).replace(os.sep, "/")
+            if not key.startswith(prefix):
+                continue
+            st = entry.stat()
+            objects.append(
+                {
+                    "Key": key,
+                    "Size": st.st_size,
+                    "ETag": self.etag(st),
+                    "LastModified": datetime.fromtimestamp(
+                        st.st_mtime, tz=timezone.utc
+                    ),
+                }
+            )
+        objects.sort(key=lambda obj: obj["Key"])
+        for i in range(0, len(objects), LIST_PAGE_SIZE):
+            yield objects[i : i + LIST_PAGE_SIZE]
+
+    def put(self, key, body):
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        with atomic_open(self.local_path(key)) as f:
+            f.write(body)
+
+    def upload(self, key, fileobj):
+        with atomic_open(self.local_path(key)) as f:
+            for chunk in iter(lambda: fileobj.read(READ_CHUNK_SIZE), b""):
+                f.write(chunk)
+
+    def delete(self, key):
+        try:
+            os.unlink(self.local_path(key))
+        except FileNotFoundError:
+            pass
+
+
+# DEVLAUNCH_STORAGE selects the backend: "s3" (default) or "local", which
+# serves DEVLAUNCH_STORAGE_ROOT. The S3 client's pool size and timeouts come
+# from DEVLAUNCH_S3_MAX_POOL, DEVLAUNCH_S3_CONNECT_TIMEOUT and
+# DEVLAUNCH_S3_READ_TIMEOUT unless passed explicitly.
+def get_storage(bucket, max_pool_connections=None):
+    backend = os.environ.get("DEVLAUNCH_STORAGE", "s3")
+    if backend == "local":
+        root = os.environ.get("DEVLAUNCH_STORAGE_ROOT")
+        if not root:
+            raise StorageError("DEVLAUNCH_STORAGE_ROOT is required for local storage")
+        return LocalStorage(root)
+    if backend != "s3":
+        raise StorageError(f"Unknown storage backend: {backend}")
+
+    return S3Storage(
+        os.environ.get("DEVLAUNCH_BUCKET", bucket),
+        max_pool_connections=max_pool_connections
+        or int(os.environ.get("DEVLAUNCH_S3_MAX_POOL", "10")),
+        connect_timeout=float(os.environ.get("DEVLAUNCH_S3_CONNECT_TIMEOUT", "5")),
+        read_timeout=float(os.environ.get("DEVLAUNCH_S3_READ_TIMEOUT", "30")),
+    )
@@ -0,0 +1,152 @@
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+
+from devlaunch.utils import atomic_open
+
+CACHE_DIR = Path(
+    os.environ.get("DEVLAUNCH_CACHE_DIR", "~/.cache/devlaunch")
+).expanduser()
+MAX_CACHE_SIZE = int(os.environ.get("DEVLAUNCH_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+
+INDEX_VERSION = 1
+
+
+def empty_index():
+    return {"version": INDEX_VERSION, "blobs": {}, "keys": {}, "templates": {}}
+
+
+# Content-addressed store for downloaded template files.
+#
+# Blobs live under blobs/<sha256[:2]>/<sha256>. index.json records each
+# blob's size and last use (for LRU eviction), the ETag last seen for every
+# remote key (for conditional requests) and, per template, the relative
+# path -> blob map and bundle ETag of its last download.
+class TemplateCache:
+    def __init__(self, root=None, max_size=None):
+        self.root = Path(root or CACHE_DIR)
+        self.max_size = MAX_CACHE_SIZE if max_size is None else max_size
+        self.index_path = self.root / "index.json"
+        self.lock = threading.Lock()
+        self.index = self.load()
+
+    def load(self):
+        try:
+            with open(self.index_path) as f:
+                index = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return empty_index()
+        if index.get("version") != INDEX_VERSION:
+            return empty_index()
+        return index
+
+    def save(self):
+        with self.lock:
+            data = json.dumps(self.index)
+        with atomic_open(str(self.index_path), "w") as f:
+            f.write(data)
+
+    def blob_path(self, digest):
+        return self.root / "blobs" / digest[:2] / digest
+
+    def has(self, digest):
+        return bool(digest) and self.blob_path(digest).is_file()
+
+    def touch(self, digest):
+        with self.lock:
+            blob = self.index["blobs"].get(digest)
+            if blob is not None:
+                blob["last_used"] = time.time()
+
+    def store(self, local_path, digest):
+        if not self.has(digest):
+            blob_path = self.blob_path(digest)
+            with atomic_open(str(blob_path)) as dst, open(local_path, "rb") as src:
+                shutil.copyfileobj(src, dst)
+        with self.lock:
+            self.index["blobs"][digest] = {
+                "size": os.path.getsize(local_path),
+                "last_used": time.time(),
+            }
+
+    # Blobs are copied out rather than hard-linked so that editing a
+    # downloaded template can never corrupt the cache.
+    def materialize(self, digest, local_path):
+        with atomic_open(local_path) as dst, open(self.blob_path(digest), "rb") as src:
+            shutil.copyfileobj(src, dst)
+        self.touch(digest)
+
+    def lookup_key(self, key):
+        with self.lock:
+            entry = self.index["keys"].get(key)
+        if entry and self.has(entry["blob"]):
+            return entry
+        return None
+
+    def remember_key(self, key, etag, digest):
+        if not etag:
+            return
+        with self.lock:
+            self.index["keys"][key] = {"etag": etag, "blob": digest}
+
+    def lookup_template(self, url):
+        with self.lock:
+            entry = self.index["templates"].get(url)
+        if entry and all(self.has(digest) for digest in entry["files"].values()):
+            return entry
+        return None
+
+    def remember_template(self, url, files, bundle_etag=None):
+        with self.lock:
+            self.index["templates"][url] = {"files": files, "bundle_etag": bundle_etag}
+
+    # Evicts least recently used blobs until the cache fits in max_size, then
+    # forgets keys and templates that pointed at them. Blob files that are on
+    # disk but unknown to the index (e.g. from an interrupted run) go too.
+    def prune(self, max_size=None):
+        max_size = self.max_size if max_size is None else max_size
+        removed = 0
+        freed = 0
+
+        with self.lock:
+            blobs = self.index["blobs"]
+            total = sum(blob["size"] for blob in blobs.values())
+            by_age = sorted(blobs.items(), key=lambda item: item[1]["last_used"])
+            for digest, blob in by_age:
+                if total <= max_size:
+                    break
+                del blobs[digest]
+                total -= blob["size"]
+
+            blobs_dir = self.root / "blobs"
+            if blobs_dir.is_dir():
+                for shard in os.scandir(blobs_dir):
+                    for entry in os.scandir(shard.path):
+                        if entry.name not in blobs:
+                            freed += entry.stat().st_size
+                            os.unlink(entry.path)
+                            removed += 1
+
+            self.index["keys"] = {
+                key: entry
+                for key, entry in self.index["keys"].items()
+                if entry["blob"] in blobs
+            }
+            self.index["templates"] = {
+                url: entry
+                for url, entry in self.index["templates"].items()
+                if all(digest in blobs for digest in entry["files"].values())
+            }
+
+        self.save()
+        return removed, freed
+
+    def clear(self):
+        removed, freed = self.prune(max_size=0)
+        with self.lock:
+            self.index = empty_index()
+        self.save()
+        return removed, freed
@@ -0,0 +1,72 @@
+from jinja2 import Environment, TemplateSyntaxError, meta, nodes
+
+# Parsing only: nothing is rendered, so no loader or undefined handling is
+# needed and one Environment can be shared by every caller and thread.
+_environment = Environment()
+
+
+def is_template_file(name: str) -> bool:
+    return name.endswith(".j2")
+
+
+# Names a template reads from its render context. Jinja globals such as
+# range() are not inputs and are left out.
+def undeclared_variables(source: str):
+    ast = _environment.parse(source)
+    return {
+        name
+        for name in meta.find_undeclared_variables(ast)
+        if name not in _environment.globals
+    }
+
+
+# The subset of undeclared_variables that is read at least once without a
+# default filter directly around it, so rendering needs a value for it.
+def required_variables(source: str):
+    ast = _environment.parse(source)
+    defaulted = {
+        id(node.node)
+        for node in ast.find_all(nodes.Filter)
+        if node.name in ("default", "d") and isinstance(node.node, nodes.Name)
+    }
+    bare = {
+        node.name
+        for node in ast.find_all(nodes.Name)
+        if node.ctx == "load" and id(node) not in defaulted
+    }
+    return bare & undeclared_variables(source)
+
+
+# Schema of a whole template from its .j2 sources ({name: source}): the
+# variables they use, and whether all of them parse. "errors" is only
+# present when one does not. "warnings" lists declared required_inputs that
+# no file uses and variables a file needs that are not declared. They are
+# only worked out when every file parses, and neither stops the template
+# from rendering, so they don't affect "valid".
+def template_schema(sources, required_inputs=()):
+    variables = set()
+    required = set()
+    errors = []
+    for name, source in sorted(sources.items()):
+        try:
+            variables |= undeclared_variables(source)
+            required |= required_variables(source)
+        except TemplateSyntaxError as e:
+            errors.append(f"{name}:{e.lineno}: {e.message}")
+
+    schema = {"variables": sorted(variables), "valid": not errors}
+    if errors:
+        schema["errors"] = errors
+        return schema
+
+    warnings = [
+        f"required input {name} is not used by any file"
+        for name in sorted(set(required_inputs) - variables)
+    ]
+    warnings += [
+        f"variable {name} has no default and is not a required input"
+        for name in sorted(required - set(required_inputs))
+    ]
+    if warnings:
+        schema["warnings"] = warnings
+    return schema
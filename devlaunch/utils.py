@@ -0,0 +1,22 @@
+import os
+import tempfile
+from contextlib import contextmanager
+
+
+# Writes go to a temporary file in the target directory and are moved into
+# place with os.replace, so readers never see a partially written file.
+@contextmanager
+def atomic_open(path, mode="wb"):
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, mode) as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
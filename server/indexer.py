@@ -1,62 +1,447 @@
-import boto3
+import argparse
+import bisect
+import hashlib
+import json
+import os
+import tarfile
+import tempfile
+import time
 import yaml
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from devlaunch.storage import NotFound, get_storage
+from devlaunch.templates.schema import is_template_file, template_schema
 
 BUCKET_NAME = "devlaunch-templates-bucket"
 INDEX_OUTPUT_KEY = "index.yaml"
 TAGS_OUTPUT_KEY = "tags.yaml"
+STATE_KEY = "indexer-state.json"
+# Optional alias -> tag map maintained by hand, e.g. {"postgresql": "postgres"}.
+SYNONYMS_KEY = "synonyms.yaml"
 
-s3 = boto3.client("s3")
+# Versioned JSON catalogs live under catalog/; catalog/current.json names the
+# live one and is only rewritten once that version has been fully uploaded.
+CATALOG_PREFIX = "catalog/"
+CATALOG_POINTER_KEY = "catalog/current.json"
+CATALOG_FORMAT = 1
+CATALOG_KEEP_VERSIONS = 3
 
+BUNDLE_PREFIX = "bundles/"
+PUBLISHED_KEYS = {INDEX_OUTPUT_KEY, TAGS_OUTPUT_KEY, STATE_KEY, SYNONYMS_KEY}
+GENERATED_PREFIXES = (BUNDLE_PREFIX, CATALOG_PREFIX)
 
-def list_template_files():
-    paginator = s3.get_paginator("list_objects_v2")
+# Bundles smaller than this are assembled in memory, larger ones spill to disk.
+BUNDLE_SPOOL_SIZE = 8 * 1024 * 1024
+
+# Templates fetched, hashed and bundled at the same time. The S3 connection
+# pool is sized to match so workers never wait for a socket.
+INDEX_WORKERS = int(os.environ.get("DEVLAUNCH_INDEX_WORKERS", "16"))
+
+storage = get_storage(BUCKET_NAME, max_pool_connections=INDEX_WORKERS)
+
+
+def list_bucket_pages():
+    return storage.list()
+
+
+def template_prefix(key):
+    prefix = os.path.dirname(key)
+    if prefix and not prefix.endswith("/"):
+        prefix += "/"
+    return prefix
+
+
+def is_published_key(key):
+    return key in PUBLISHED_KEYS or key.startswith(GENERATED_PREFIXES)
+
+
+# A bundle key carries a digest of the files it holds and is never
+# overwritten with other content. An API still serving an older catalog
+# therefore streams the bundle matching the hashes that catalog hands out.
+# Superseded bundles are deleted in retire_bundles once no kept catalog
+# version can point at them.
+def bundle_key(prefix, manifest):
+    digest = hashlib.sha256(
+        json.dumps([[item["key"], item["sha256"]] for item in manifest]).encode()
+    ).hexdigest()
+    return f"{BUNDLE_PREFIX}{prefix.rstrip('/') or 'root'}-{digest[:16]}.tar.gz"
+
+
+# Hashes a file while tarfile copies it into the bundle, so each object is
+# downloaded exactly once per index run. With keep=True the data is also
+# held on to, for the small files that get parsed or analysed.
+class HashingReader:
+    def __init__(self, raw, keep=False):
+        self.raw = raw
+        self.digest = hashlib.sha256()
+        self.chunks = [] if keep else None
+
+    def read(self, size=-1):
+        data = self.raw.read(size)
+        self.digest.update(data)
+        if self.chunks is not None:
+            self.chunks.append(data)
+        return data
+
+
+# Storage lists keys in sorted order, so every template's files form one
+# contiguous run that can be located with a binary search.
+def objects_under(prefix, objects, keys):
     result = []
-    for page in paginator.paginate(Bucket=BUCKET_NAME):
-        for obj in page.get("Contents", []):
-            key = obj["Key"]
-            if key.endswith("template.yaml"):
-                result.append(key)
+    start = bisect.bisect_left(keys, prefix)
+    for obj in objects[start:]:
+        key = obj["Key"]
+        if not key.startswith(prefix):
+            break
+        if not is_published_key(key):
+            result.append(obj)
     return result
 
 
-def fetch_and_parse_template(key):
-    response = s3.get_object(Bucket=BUCKET_NAME, Key=key)
-    content = response["Body"].read()
-    data = yaml.safe_load(content)
+# sources, when given, is filled with the text of the template's .j2 files
+# and of config_key (its template.yaml), keyed by their path inside the
+# template.
+def build_template_artifacts(prefix, template_objects, sources=None, config_key=None):
+    manifest = []
+    bundle = tempfile.SpooledTemporaryFile(max_size=BUNDLE_SPOOL_SIZE)
+
+    with tarfile.open(fileobj=bundle, mode="w:gz") as tar:
+        for obj in template_objects:
+            key = obj["Key"]
+            response = storage.get(key)
+            keep = sources is not None and (is_template_file(key) or key == config_key)
+            reader = HashingReader(response["Body"], keep)
+            info = tarfile.TarInfo(key[len(prefix) :])
+            info.size = obj["Size"]
+            info.mode = 0o644
+            if obj.get("LastModified"):
+                info.mtime = int(obj["LastModified"].timestamp())
+            tar.addfile(info, reader)
+            if keep:
+                sources[info.name] = b"".join(reader.chunks).decode(
+                    "utf-8", errors="replace"
+                )
+
+            manifest.append(
+                {
+                    "key": key,
+                    "size": obj["Size"],
+                    "etag": obj["ETag"],
+                    "sha256": reader.digest.hexdigest(),
+                }
+            )
+
+    bundle.seek(0)
+    return manifest, bundle
+
+
+def upload_bundle(prefix, bundle, manifest):
+    key = bundle_key(prefix, manifest)
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: bundle.read(1024 * 1024), b""):
+        digest.update(chunk)
+    size = bundle.tell()
+    bundle.seek(0)
+    storage.upload(key, bundle)
+    return {"key": key, "size": size, "sha256": digest.hexdigest()}
+
+
+def parse_template_config(key, text):
+    data = yaml.safe_load(text)
 
     if "tags" not in data:
         raise ValueError(f"Missing 'tags' in {key}")
 
-    return {"tags": data["tags"], "url": key}
+    entry = {"tags": data["tags"], "url": key}
+    if data.get("required_inputs"):
+        entry["required_inputs"] = list(data["required_inputs"])
+    return entry
 
 
 def upload_file(key, data):
     body = yaml.dump(data, sort_keys=False)
-    s3.put_object(Bucket=BUCKET_NAME, Key=key, Body=body.encode("utf-8"))
+    storage.put(key, body.encode("utf-8"))
+
+
+def catalog_key(version):
+    return f"{CATALOG_PREFIX}v{version}.json"
+
+
+# Tags are interned as ids into the sorted tag list and the tag -> template
+# postings are precomputed, so the API only has to json.loads the artifact.
+def build_catalog_artifact(version, templates, sorted_tags, synonyms=None):
+    tag_ids = {tag: tag_id for tag_id, tag in enumerate(sorted_tags)}
+    postings = [[] for _ in sorted_tags]
+    entries = []
+    for template_id, data in enumerate(templates):
+        ids = sorted({tag_ids[tag] for tag in data["tags"]})
+        for tag_id in ids:
+            postings[tag_id].append(template_id)
+        entries.append(dict(data, tags=ids))
+
+    return {
+        "format": CATALOG_FORMAT,
+        "version": version,
+        "tags": sorted_tags,
+        "templates": entries,
+        "postings": postings,
+        "synonyms": synonyms or {},
+    }
+
+
+def put_json(key, data):
+    body = json.dumps(data, separators=(",", ":"))
+    storage.put(key, body.encode("utf-8"))
 
 
-def main():
-    template_keys = list_template_files()
+def publish_catalog(version, templates, sorted_tags, synonyms=None):
+    key = catalog_key(version)
+    put_json(key, build_catalog_artifact(version, templates, sorted_tags, synonyms))
+    put_json(
+        CATALOG_POINTER_KEY,
+        {
+            "format": CATALOG_FORMAT,
+            "version": version,
+            "key": key,
+            "templates": len(templates),
+            "tags": len(sorted_tags),
+        },
+    )
+    # Older versions stay around briefly for API workers still loading them.
+    if version > CATALOG_KEEP_VERSIONS:
+        storage.delete(catalog_key(version - CATALOG_KEEP_VERSIONS))
+    return key
+
+
+def bundle_keys(templates):
+    return {entry["bundle"]["key"] for entry in templates if entry.get("bundle")}
+
+
+# Bundles that the new version no longer uses are queued with that version
+# number. Catalogs up to the previous version still point at them, so each
+# is deleted together with the last of those catalogs (see publish_catalog).
+# Returns the queue that is still pending.
+def retire_bundles(state, templates, version):
+    live = bundle_keys(templates)
+    retired = [
+        item for item in state.get("retired_bundles", []) if item["key"] not in live
+    ]
+    queued = {item["key"] for item in retired}
+    for key in sorted(bundle_keys(state["templates"].values()) - live - queued):
+        retired.append({"key": key, "version": version})
+
+    pending = []
+    for item in retired:
+        if item["version"] - 1 <= version - CATALOG_KEEP_VERSIONS:
+            storage.delete(item["key"])
+        else:
+            pending.append(item)
+    return pending
+
+
+def load_synonyms():
+    try:
+        synonyms = yaml.safe_load(storage.read(SYNONYMS_KEY)) or {}
+    except NotFound:
+        return {}
+    if not isinstance(synonyms, dict):
+        raise ValueError(f"{SYNONYMS_KEY} must map aliases to tags")
+    return {str(alias): tag for alias, tag in synonyms.items()}
+
+
+def empty_state():
+    return {"version": 0, "templates": {}}
+
+
+# The state records the index entry built for every template on the last
+# run, including the (key, ETag) of each file it was built from.
+def load_state():
+    try:
+        return json.loads(storage.read(STATE_KEY))
+    except NotFound:
+        return empty_state()
+    except ValueError as e:
+        print(f"Ignoring unreadable {STATE_KEY}: {e}")
+        return empty_state()
+
+
+def save_state(state):
+    put_json(STATE_KEY, state)
+
+
+# Storage lists keys in sorted order, so once a page ends past a template's
+# prefix all of its files have been seen. Such templates are yielded right
+# away and can be indexed while the rest of the bucket is still listed.
+# objects and keys are filled in as pages arrive.
+def iter_listed_templates(objects, keys):
+    open_templates = []
+    for contents in list_bucket_pages():
+        for obj in contents:
+            objects.append(obj)
+            keys.append(obj["Key"])
+            if obj["Key"].endswith("template.yaml"):
+                open_templates.append(obj["Key"])
+        if not keys:
+            continue
+
+        last_key = keys[-1]
+        still_open = []
+        for key in open_templates:
+            prefix = template_prefix(key)
+            if last_key.startswith(prefix):
+                still_open.append(key)
+            else:
+                yield key, objects_under(prefix, objects, keys)
+        open_templates = still_open
+
+    for key in open_templates:
+        yield key, objects_under(template_prefix(key), objects, keys)
+
+
+# Entries indexed before schemas were recorded count as changed, so the
+# first run after an upgrade fills them in.
+def is_unchanged(entry, template_objects):
+    return "valid" in entry and [
+        (item["key"], item["etag"]) for item in entry.get("files", [])
+    ] == [(obj["Key"], obj["ETag"]) for obj in template_objects]
+
+
+# template.yaml is parsed from the copy read for the bundle, not fetched
+# again.
+def index_template(key, template_objects):
+    prefix = template_prefix(key)
+    sources = {}
+    manifest, bundle = build_template_artifacts(
+        prefix, template_objects, sources, config_key=key
+    )
+    with bundle:
+        data = parse_template_config(key, sources.pop(key[len(prefix) :]))
+        data.update(template_schema(sources, data.get("required_inputs", [])))
+        data["files"] = manifest
+        data["bundle"] = upload_bundle(prefix, bundle, manifest)
+    return data
+
+
+# Only templates whose files were added, changed or removed since the last
+# run are fetched again; everything else is carried over from the state.
+# Changed templates are indexed on a thread pool while listing continues,
+# and a failing template is reported without stopping the run.
+def main(full=False):
+    started = time.monotonic()
+    state = load_state()
+    previous = {} if full else state["templates"]
+    synonyms = load_synonyms()
+    current = {}
+    errors = {}
+    template_keys = []
+    fetched_bytes = 0
+
+    with ThreadPoolExecutor(max_workers=INDEX_WORKERS) as pool:
+        futures = {}
+        for key, template_objects in iter_listed_templates([], []):
+            template_keys.append(key)
+            entry = previous.get(key)
+            if entry is not None and is_unchanged(entry, template_objects):
+                current[key] = entry
+                continue
+            futures[pool.submit(index_template, key, template_objects)] = key
+            fetched_bytes += sum(obj["Size"] for obj in template_objects)
+
+        for future in as_completed(futures):
+            key = futures[future]
+            try:
+                current[key] = future.result()
+            except Exception as e:
+                errors[key] = str(e)
+                print(f"Error processing {key}: {e}")
+
+    # A template that fails to reindex keeps its last good entry rather than
+    # disappearing from the published index.
+    kept = [key for key in errors if key in state["templates"]]
+    for key in kept:
+        current[key] = state["templates"][key]
+        print(f"Keeping the previously indexed version of {key}")
+
+    template_keys.sort()
+    changed = len(futures) - len(errors)
+    removed = sorted(previous.keys() - set(template_keys))
+    elapsed = max(time.monotonic() - started, 1e-6)
     print(f"Found {len(template_keys)} template.yaml files.")
+    print(
+        f"{changed} changed, {len(removed)} removed, "
+        f"{len(current) - changed - len(kept)} unchanged, {len(errors)} failed."
+    )
+    print(
+        f"Indexed {fetched_bytes / 1024 / 1024:.1f} MiB in {elapsed:.2f}s "
+        f"({len(futures) / elapsed:.1f} templates/s, "
+        f"{fetched_bytes / 1024 / 1024 / elapsed:.1f} MiB/s)"
+    )
+    # Broken templates stay in the index, flagged, so clients can refuse them
+    # before downloading anything.
+    # Entries kept from a state older than the schema have no "valid" yet.
+    invalid = sorted(
+        key for key, entry in current.items() if not entry.get("valid", True)
+    )
+    for key in invalid:
+        print(f"Invalid template {key}: {'; '.join(current[key]['errors'])}")
+    warnings = {
+        key: entry["warnings"] for key, entry in current.items() if "warnings" in entry
+    }
+    for key in sorted(warnings):
+        print(f"Warnings for {key}: {'; '.join(warnings[key])}")
+    stats = {
+        "templates": len(template_keys),
+        "invalid": invalid,
+        "warnings": warnings,
+        "changed": changed,
+        "removed": len(removed),
+        "errors": errors,
+        "fetched_bytes": fetched_bytes,
+        "elapsed": elapsed,
+        "published": False,
+    }
+
+    if (
+        not changed
+        and not removed
+        and not full
+        and synonyms == state.get("synonyms", {})
+    ):
+        print("Index is up to date, nothing published.")
+        return stats
 
-    templates = []
+    templates = [current[key] for key in template_keys if key in current]
     tag_set = set()
+    for data in templates:
+        tag_set.update(data["tags"])
 
-    for key in template_keys:
-        try:
-            data = fetch_and_parse_template(key)
-            templates.append(data)
-            tag_set.update(data["tags"])
-        except Exception as e:
-            print(f"Error processing {key}: {e}")
+    version = state["version"] + 1
+    sorted_tags = sorted(tag_set)
+    key = publish_catalog(version, templates, sorted_tags, synonyms)
+    print(f"Uploaded catalog to {key}")
 
     upload_file(INDEX_OUTPUT_KEY, templates)
-    print(f"Uploaded index to s3://{BUCKET_NAME}/{INDEX_OUTPUT_KEY}")
+    print(f"Uploaded index to {INDEX_OUTPUT_KEY}")
 
-    sorted_tags = sorted(tag_set)
     upload_file(TAGS_OUTPUT_KEY, sorted_tags)
-    print(f"Uploaded tags to s3://{BUCKET_NAME}/{TAGS_OUTPUT_KEY}")
+    print(f"Uploaded tags to {TAGS_OUTPUT_KEY}")
+
+    # Only now that the pointer has moved on are old bundles retired.
+    retired = retire_bundles(state, templates, version)
+    save_state(
+        {
+            "version": version,
+            "templates": current,
+            "synonyms": synonyms,
+            "retired_bundles": retired,
+        }
+    )
+    print(f"Published index version {version}")
+    return dict(stats, published=True, version=version)
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Build the devlaunch template index")
+    parser.add_argument(
+        "--full", action="store_true", help="ignore the saved state and reindex all"
+    )
+    main(full=parser.parse_args().full)
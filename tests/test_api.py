@@ -1,4 +1,8 @@
+import io
+import json
 import sys
+import tarfile
+import threading
 from unittest.mock import MagicMock, patch
 import pytest
 
@@ -6,7 +10,31 @@ import pytest
 sys.modules["boto3"] = MagicMock()
 
 
+import api.app
 from api.app import app
+from devlaunch.storage import LocalStorage, S3Storage
+
+
+class ClientError(Exception):
+    def __init__(self, status, code):
+        super().__init__(code)
+        self.response = {
+            "Error": {"Code": code},
+            "ResponseMetadata": {"HTTPStatusCode": status},
+        }
+
+
+class NoSuchKey(ClientError):
+    pass
+
+
+# The API looks for a versioned JSON catalog first; these tests cover the
+# YAML index published by older indexers.
+def missing_pointer(mock_s3):
+    mock_s3.exceptions.ClientError = ClientError
+    mock_s3.exceptions.NoSuchKey = NoSuchKey
+    return NoSuchKey(404, "NoSuchKey")
+
 
 @pytest.fixture
 def client():
@@ -14,13 +42,36 @@ def client():
         yield client
 
 
+@pytest.fixture
+def mock_s3():
+    client = MagicMock()
+    with patch("api.app.storage", S3Storage(api.app.BUCKET_NAME, client=client)):
+        yield client
+
+
+@pytest.fixture(autouse=True)
+def reset_catalog():
+    api.app._catalog = None
+    api.app.resolve_cache.clear()
+    yield
+    api.app.stop_catalog_refresher()
+    api.app._catalog = None
+
+
+def yaml_object(body, etag=None):
+    obj = {"Body": MagicMock(read=lambda: body)}
+    if etag:
+        obj["ETag"] = etag
+    return obj
+
+
 # ---------------------- /resolve ----------------------
 
 
-@patch("api.app.s3")
 def test_resolve_valid_prompt(mock_s3, client):
     # Mock tags.yaml and index.yaml
     mock_s3.get_object.side_effect = [
+        missing_pointer(mock_s3),
         {"Body": MagicMock(read=lambda: b"- docker\n- postgres")},
         {
             "Body": MagicMock(
@@ -48,16 +99,15 @@ def test_resolve_valid_prompt(mock_s3, client):
     assert "files" in data
 
 
-@patch("api.app.s3")
 def test_resolve_empty_prompt(mock_s3, client):
     res = client.post("/resolve", json={})
     assert res.status_code == 400
     assert res.get_json()["error"] == "No prompt provided"
 
 
-@patch("api.app.s3")
 def test_resolve_no_match(mock_s3, client):
     mock_s3.get_object.side_effect = [
+        missing_pointer(mock_s3),
         {"Body": MagicMock(read=lambda: b"- docker\n- postgres")},
         {
             "Body": MagicMock(
@@ -75,27 +125,397 @@ def test_resolve_no_match(mock_s3, client):
     assert res.get_json()["matched"] is None
 
 
+def test_resolve_reuses_cached_catalog(mock_s3, client):
+    mock_s3.get_object.side_effect = [
+        missing_pointer(mock_s3),
+        yaml_object(b"- postgres", '"t1"'),
+        yaml_object(b"- tags: [postgres]\n  url: postgres/template.yaml", '"i1"'),
+    ]
+    mock_s3.get_paginator.return_value.paginate.return_value = [
+        {"Contents": [{"Key": "postgres/template.yaml"}]}
+    ]
+
+    for _ in range(3):
+        res = client.post("/resolve", json={"prompt": "postgres please"})
+        assert res.get_json()["matched"]["url"] == "postgres/template.yaml"
+
+    assert mock_s3.get_object.call_count == 3
+
+
+def test_catalog_revalidates_with_etag(mock_s3, client):
+    mock_s3.exceptions.ClientError = ClientError
+    mock_s3.get_object.side_effect = [
+        missing_pointer(mock_s3),
+        yaml_object(b"- postgres", '"t1"'),
+        yaml_object(b"- tags: [postgres]\n  url: postgres/template.yaml", '"i1"'),
+        missing_pointer(mock_s3),
+        ClientError(304, "304"),
+        yaml_object(b"- tags: [postgres]\n  url: pg/template.yaml", '"i2"'),
+    ]
+
+    first = api.app.get_catalog()
+    with patch("api.app.CATALOG_TTL", 0):
+        second = api.app.get_catalog()
+
+    assert mock_s3.get_object.call_args_list[4].kwargs["IfNoneMatch"] == '"t1"'
+    assert mock_s3.get_object.call_args_list[5].kwargs["IfNoneMatch"] == '"i1"'
+    assert second is not first
+    assert second["tags"] is first["tags"]
+    assert second["index"][0]["url"] == "pg/template.yaml"
+    assert second["version"] == '"i2"'
+
+
+def json_object(data, etag=None):
+    return yaml_object(json.dumps(data).encode("utf-8"), etag)
+
+
+ARTIFACT = {
+    "format": 1,
+    "version": 7,
+    "tags": ["docker", "postgres"],
+    "templates": [
+        {"tags": [1], "url": "pg/template.yaml", "files": []},
+        {"tags": [0, 1], "url": "compose-pg/template.yaml", "files": []},
+    ],
+    "postings": [[1], [0, 1]],
+}
+POINTER = {"format": 1, "version": 7, "key": "catalog/v7.json"}
+
+
+def test_catalog_loads_versioned_artifact(mock_s3, client):
+    mock_s3.get_object.side_effect = [
+        json_object(POINTER, '"p7"'),
+        json_object(ARTIFACT),
+    ]
+
+    res = client.post("/resolve", json={"prompt": "docker with postgres"})
+    data = res.get_json()
+
+    assert data["matched"]["url"] == "compose-pg/template.yaml"
+    assert data["matched"]["tags"] == ["docker", "postgres"]
+    assert data["candidates"][0]["template"]["url"] == "pg/template.yaml"
+    assert mock_s3.get_object.call_args.kwargs["Key"] == "catalog/v7.json"
+    assert api.app.get_catalog()["version"] == 7
+
+
+def test_catalog_swaps_artifact_on_new_version(mock_s3, client):
+    mock_s3.exceptions.ClientError = ClientError
+    mock_s3.get_object.side_effect = [
+        json_object(POINTER, '"p7"'),
+        json_object(ARTIFACT),
+        ClientError(304, "304"),
+        json_object(dict(POINTER, version=8, key="catalog/v8.json"), '"p8"'),
+        json_object(dict(ARTIFACT, version=8, templates=ARTIFACT["templates"][:1])),
+    ]
+
+    first = api.app.get_catalog()
+    with patch("api.app.CATALOG_TTL", 0):
+        unchanged = api.app.get_catalog()
+        updated = api.app.get_catalog()
+
+    assert unchanged["index"] is first["index"]
+    assert mock_s3.get_object.call_args_list[2].kwargs["IfNoneMatch"] == '"p7"'
+    assert updated["version"] == 8
+    assert len(updated["index"]) == 1
+
+
+def test_catalog_serves_stale_when_s3_fails(mock_s3, client):
+    mock_s3.exceptions.ClientError = ClientError
+    mock_s3.get_object.side_effect = [
+        missing_pointer(mock_s3),
+        yaml_object(b"- postgres", '"t1"'),
+        yaml_object(b"- tags: [postgres]\n  url: postgres/template.yaml", '"i1"'),
+        ClientError(503, "SlowDown"),
+    ]
+
+    first = api.app.get_catalog()
+    with patch("api.app.CATALOG_TTL", 0):
+        second = api.app.get_catalog()
+
+    assert second["index"] == first["index"]
+
+
+def test_catalog_loads_from_local_storage(tmp_path, client):
+    storage = LocalStorage(tmp_path)
+    storage.put("tags.yaml", b"- postgres")
+    storage.put("index.yaml", b"- tags: [postgres]\n  url: pg/template.yaml")
+    storage.put("pg/template.yaml", b"tags: [postgres]")
+
+    with patch("api.app.storage", storage):
+        res = client.post("/resolve", json={"prompt": "postgres please"})
+
+    assert res.get_json()["files"] == ["pg/template.yaml"]
+
+
+def test_reload_catalog_ignores_ttl(tmp_path, client):
+    storage = LocalStorage(tmp_path)
+    storage.put("tags.yaml", b"- postgres")
+    storage.put("index.yaml", b"- tags: [postgres]\n  url: pg/template.yaml")
+
+    with patch("api.app.storage", storage):
+        api.app.warm_catalog()
+        storage.put("tags.yaml", b"- postgres\n- redis")
+        catalog = api.app.reload_catalog()
+
+    assert catalog["tags"] == {"postgres", "redis"}
+    assert api.app.get_catalog() is catalog
+
+
+def test_refresher_swaps_catalog_off_request_path(tmp_path, client):
+    storage = LocalStorage(tmp_path)
+    storage.put("tags.yaml", b"- postgres")
+    storage.put("index.yaml", b"- tags: [postgres]\n  url: pg/template.yaml")
+    swapped = threading.Event()
+
+    with patch("api.app.storage", storage), patch("api.app.CATALOG_TTL", 0):
+        first = api.app.warm_catalog()
+        api.app.start_catalog_refresher(0.01, on_change=lambda c: swapped.set())
+        try:
+            # Requests never wait on a reload, even with an expired TTL.
+            with api.app._catalog_lock:
+                assert api.app.get_catalog() is api.app._catalog
+            storage.put("index.yaml", b"- tags: [postgres]\n  url: pg2/template.yaml")
+            assert swapped.wait(5)
+        finally:
+            api.app.stop_catalog_refresher()
+
+    assert first["index"][0]["url"] == "pg/template.yaml"
+    assert api.app.get_catalog()["index"][0]["url"] == "pg2/template.yaml"
+
+
+def test_pinned_catalog_is_not_revalidated(tmp_path, client, monkeypatch):
+    storage = LocalStorage(tmp_path)
+    storage.put("tags.yaml", b"- postgres")
+    storage.put("index.yaml", b"- tags: [postgres]\n  url: pg/template.yaml")
+    monkeypatch.setattr(api.app, "_catalog_pinned", False)
+
+    with patch("api.app.storage", storage), patch("api.app.CATALOG_TTL", 0):
+        first = api.app.warm_catalog()
+        api.app.pin_catalog()
+        storage.put("index.yaml", b"- tags: [postgres]\n  url: pg2/template.yaml")
+
+        assert api.app.get_catalog() is first
+
+
+def test_forked_child_gets_its_own_storage_and_locks(monkeypatch):
+    for name in ("storage", "_catalog_lock", "_refresher", "_refresher_stop"):
+        monkeypatch.setattr(api.app, name, getattr(api.app, name))
+    monkeypatch.setattr(api.app.resolve_cache, "lock", api.app.resolve_cache.lock)
+    inherited = (
+        api.app.storage,
+        api.app._catalog_lock,
+        api.app._refresher_stop,
+        api.app.resolve_cache.lock,
+    )
+
+    api.app.reset_after_fork()
+
+    assert api.app.storage is not inherited[0]
+    assert api.app._catalog_lock is not inherited[1]
+    assert api.app._refresher_stop is not inherited[2]
+    assert api.app.resolve_cache.lock is not inherited[3]
+    assert api.app._refresher is None
+
+
+def test_metrics_report_stages_and_index(tmp_path, client):
+    storage = LocalStorage(tmp_path)
+    storage.put("tags.yaml", b"- postgres")
+    storage.put("index.yaml", b"- tags: [postgres]\n  url: pg/template.yaml")
+    storage.put("pg/template.yaml", b"tags: [postgres]")
+
+    misses = api.metrics.RESOLVE_CACHE_MISSES.snapshot().get((), 0)
+
+    with patch("api.app.storage", storage):
+        res = client.post("/resolve", json={"prompt": "postgres please"})
+        metrics = client.get("/metrics").get_data(as_text=True)
+
+    timing = res.headers["Server-Timing"]
+    assert "extract;dur=" in timing and "storage_list;dur=" in timing
+    assert 'devlaunch_request_duration_seconds_count{route="/resolve"' in metrics
+    assert 'devlaunch_stage_duration_seconds_count{stage="parse"}' in metrics
+    assert 'devlaunch_storage_requests_total{operation="list"}' in metrics
+    assert "devlaunch_index_templates 1" in metrics
+    assert f"devlaunch_resolve_cache_misses_total {misses + 1}" in metrics
+
+
+RANKED_INDEX = b"""
+- tags: [docker, postgres, redis]
+  url: full/template.yaml
+- tags: [postgres]
+  url: pg/template.yaml
+- tags: [docker, postgres]
+  url: compose-pg/template.yaml
+- tags: [nginx]
+  url: nginx/template.yaml
+"""
+
+
+def test_resolve_returns_ranked_candidates(mock_s3, client):
+    mock_s3.get_object.side_effect = [
+        missing_pointer(mock_s3),
+        yaml_object(b"- docker\n- postgres\n- redis\n- nginx"),
+        yaml_object(RANKED_INDEX),
+    ]
+    mock_s3.get_paginator.return_value.paginate.return_value = [{"Contents": []}]
+
+    res = client.post("/resolve", json={"prompt": "docker and postgres"})
+    data = res.get_json()
+
+    assert data["matched"]["url"] == "compose-pg/template.yaml"
+    assert [c["template"]["url"] for c in data["candidates"]] == [
+        "full/template.yaml",
+        "pg/template.yaml",
+    ]
+    assert data["candidates"][0]["score"] == round(2 / 3, 4)
+    assert data["candidates"][0]["overlap"] == 2
+
+
+def test_resolve_near_miss_has_candidates(mock_s3, client):
+    mock_s3.get_object.side_effect = [
+        missing_pointer(mock_s3),
+        yaml_object(b"- docker\n- postgres\n- redis\n- nginx"),
+        yaml_object(RANKED_INDEX),
+    ]
+
+    res = client.post("/resolve", json={"prompt": "redis and nginx", "top_k": 1})
+    data = res.get_json()
+
+    assert data["matched"] is None
+    assert len(data["candidates"]) == 1
+    assert data["candidates"][0]["template"]["url"] == "nginx/template.yaml"
+    mock_s3.get_paginator.assert_not_called()
+
+
+def test_resolve_serves_manifest_from_index(mock_s3, client):
+    mock_s3.get_object.side_effect = [
+        missing_pointer(mock_s3),
+        yaml_object(b"- postgres"),
+        yaml_object(
+            b"""
+- tags: [postgres]
+  url: pg/template.yaml
+  files:
+    - {key: pg/docker-compose.j2, size: 10, etag: '"e1"', sha256: abc}
+    - {key: pg/template.yaml, size: 20, etag: '"e2"', sha256: def}
+"""
+        ),
+    ]
+
+    res = client.post("/resolve", json={"prompt": "postgres"})
+    data = res.get_json()
+
+    assert data["files"] == ["pg/docker-compose.j2", "pg/template.yaml"]
+    assert data["manifest"][0]["sha256"] == "abc"
+    assert "files" not in data["matched"]
+    mock_s3.get_paginator.assert_not_called()
+
+
+def test_resolve_caches_results_by_tag_set(mock_s3, client):
+    mock_s3.get_object.side_effect = [
+        json_object(POINTER, '"p7"'),
+        json_object(ARTIFACT),
+    ]
+
+    first = client.post("/resolve", json={"prompt": "docker with postgres"})
+    second = client.post("/resolve", json={"prompt": "Postgres on Docker!"})
+    other = client.post("/resolve", json={"prompt": "postgres on docker", "top_k": 0})
+
+    assert first.headers["X-Cache"] == "MISS"
+    assert second.headers["X-Cache"] == "HIT"
+    assert other.headers["X-Cache"] == "MISS"
+    assert second.get_json() == first.get_json()
+    stats = client.get("/stats").get_json()
+    assert stats["index_version"] == 7
+    assert stats["resolve_cache"]["hits"] == 1
+    assert stats["resolve_cache"]["misses"] == 2
+
+
+def test_resolve_cache_is_invalidated_by_new_version(mock_s3, client):
+    mock_s3.get_object.side_effect = [
+        json_object(POINTER, '"p7"'),
+        json_object(ARTIFACT),
+        json_object(dict(POINTER, version=8, key="catalog/v8.json"), '"p8"'),
+        json_object(
+            dict(
+                ARTIFACT,
+                version=8,
+                templates=ARTIFACT["templates"][:1],
+                postings=[[], [0]],
+            )
+        ),
+    ]
+
+    client.post("/resolve", json={"prompt": "docker with postgres"})
+    with patch("api.app.CATALOG_TTL", 0):
+        res = client.post("/resolve", json={"prompt": "docker with postgres"})
+
+    assert res.headers["X-Cache"] == "MISS"
+    assert res.get_json()["matched"] is None
+
+
+def test_resolve_batch_keeps_order_and_dedupes(mock_s3, client):
+    mock_s3.get_object.side_effect = [
+        json_object(POINTER, '"p7"'),
+        json_object(ARTIFACT),
+    ]
+
+    res = client.post(
+        "/resolve/batch",
+        json={
+            "prompts": [
+                "docker with postgres",
+                "",
+                "just postgres",
+                "Postgres + Docker",
+            ]
+        },
+    )
+    data = res.get_json()
+
+    assert res.status_code == 200
+    assert data["index_version"] == 7
+    assert data["unique"] == 2
+    assert [r.get("matched", {}).get("url") for r in data["results"]] == [
+        "compose-pg/template.yaml",
+        None,
+        "pg/template.yaml",
+        "compose-pg/template.yaml",
+    ]
+    assert data["results"][1] == {"error": "No prompt provided"}
+    assert mock_s3.get_object.call_count == 2
+
+
+def test_resolve_batch_rejects_bad_payload(client):
+    assert client.post("/resolve/batch", json={"prompts": "x"}).status_code == 400
+    res = client.post("/resolve/batch", json={"prompts": ["x"] * 1001})
+    assert res.status_code == 400
+
+
+def test_resolve_rejects_invalid_top_k(client):
+    res = client.post("/resolve", json={"prompt": "postgres", "top_k": "ten"})
+    assert res.status_code == 400
+
+
 # ---------------------- /download ----------------------
 
 
-@patch("api.app.s3")
 def test_download_valid_key(mock_s3, client):
     mock_file = b"fake content"
-    mock_s3.get_object.return_value = {"Body": MagicMock(read=lambda: mock_file)}
+    mock_s3.get_object.return_value = {
+        "Body": MagicMock(iter_chunks=lambda chunk_size: iter([mock_file]))
+    }
 
     res = client.get("/download?key=somefile.txt")
     assert res.status_code == 200
     assert res.data == mock_file
 
 
-@patch("api.app.s3")
 def test_download_no_key(mock_s3, client):
     res = client.get("/download")
     assert res.status_code == 400
     assert res.get_json()["error"] == "No key provided"
 
 
-@patch("api.app.s3")
 def test_download_key_not_found(mock_s3, client):
     mock_s3.get_object.side_effect = mock_s3.exceptions.NoSuchKey = Exception(
         "KeyNotFound"
@@ -105,3 +525,162 @@ def test_download_key_not_found(mock_s3, client):
     assert res.status_code in (404, 500)
 
 
+def test_download_streams_in_chunks(mock_s3, client):
+    body = MagicMock(iter_chunks=lambda chunk_size: iter([b"abc", b"def"]))
+    mock_s3.get_object.return_value = {
+        "Body": body,
+        "ContentLength": 6,
+        "ETag": '"e1"',
+    }
+
+    res = client.get("/download?key=pg/docker-compose.j2")
+
+    assert res.data == b"abcdef"
+    assert res.headers["ETag"] == '"e1"'
+    assert res.headers["Content-Length"] == "6"
+    assert res.headers["Accept-Ranges"] == "bytes"
+    assert "docker-compose.j2" in res.headers["Content-Disposition"]
+    body.close.assert_called_once()
+
+
+def test_download_forwards_range(mock_s3, client):
+    mock_s3.get_object.return_value = {
+        "Body": MagicMock(iter_chunks=lambda chunk_size: iter([b"bc"])),
+        "ContentLength": 2,
+        "ContentRange": "bytes 1-2/6",
+    }
+
+    res = client.get("/download?key=file.txt", headers={"Range": "bytes=1-2"})
+
+    assert res.status_code == 206
+    assert res.headers["Content-Range"] == "bytes 1-2/6"
+    assert mock_s3.get_object.call_args.kwargs["Range"] == "bytes=1-2"
+
+
+def test_download_not_modified(mock_s3, client):
+    mock_s3.exceptions.NoSuchKey = type("NoSuchKey", (ClientError,), {})
+    mock_s3.exceptions.ClientError = ClientError
+    mock_s3.get_object.side_effect = ClientError(304, "304")
+
+    res = client.get("/download?key=file.txt", headers={"If-None-Match": '"e1"'})
+
+    assert res.status_code == 304
+    assert res.headers["ETag"] == '"e1"'
+    assert mock_s3.get_object.call_args.kwargs["IfNoneMatch"] == '"e1"'
+
+
+def test_download_invalid_range(mock_s3, client):
+    mock_s3.exceptions.NoSuchKey = type("NoSuchKey", (ClientError,), {})
+    mock_s3.exceptions.ClientError = ClientError
+    mock_s3.get_object.side_effect = ClientError(416, "InvalidRange")
+
+    res = client.get("/download?key=file.txt", headers={"Range": "bytes=99-"})
+
+    assert res.status_code == 416
+
+
+def test_download_from_local_storage(tmp_path, client):
+    storage = LocalStorage(tmp_path)
+    storage.put("pg/docker-compose.j2", b"image: postgres")
+
+    with patch("api.app.storage", storage):
+        res = client.get("/download?key=pg/docker-compose.j2")
+        partial = client.get(
+            "/download?key=pg/docker-compose.j2", headers={"Range": "bytes=0-4"}
+        )
+        cached = client.get(
+            "/download?key=pg/docker-compose.j2",
+            headers={"If-None-Match": res.headers["ETag"]},
+        )
+        missing = client.get("/download?key=../etc/passwd")
+
+    assert res.data == b"image: postgres"
+    assert "docker-compose.j2" in res.headers["Content-Disposition"]
+    assert partial.status_code == 206
+    assert partial.data == b"image"
+    assert cached.status_code == 304
+    assert missing.status_code == 404
+
+
+# ---------------------- /bundle ----------------------
+
+
+BUNDLE_INDEX = b"""
+- tags: [postgres]
+  url: pg/template.yaml
+  files:
+    - {key: pg/docker-compose.j2, size: 5, etag: '"e1"', sha256: abc}
+    - {key: pg/template.yaml, size: 4, etag: '"e2"', sha256: def}
+- tags: [nginx]
+  url: nginx/template.yaml
+  bundle: {key: bundles/nginx.tar.gz, size: 10, sha256: abc}
+"""
+
+
+def s3_file(content):
+    return {
+        "Body": MagicMock(iter_chunks=lambda chunk_size: iter([content])),
+        "ContentLength": len(content),
+    }
+
+
+def test_bundle_streams_template_archive(mock_s3, client):
+    mock_s3.get_object.side_effect = [
+        missing_pointer(mock_s3),
+        yaml_object(b"- postgres\n- nginx"),
+        yaml_object(BUNDLE_INDEX),
+        s3_file(b"image"),
+        s3_file(b"tags"),
+    ]
+
+    res = client.get("/bundle?template=pg/template.yaml")
+
+    assert res.status_code == 200
+    assert res.headers["ETag"]
+    with tarfile.open(fileobj=io.BytesIO(res.data), mode="r:gz") as tar:
+        assert tar.getnames() == ["docker-compose.j2", "template.yaml"]
+        assert tar.extractfile("docker-compose.j2").read() == b"image"
+
+
+def test_bundle_not_modified(mock_s3, client):
+    mock_s3.get_object.side_effect = [
+        missing_pointer(mock_s3),
+        yaml_object(b"- postgres\n- nginx"),
+        yaml_object(BUNDLE_INDEX),
+        s3_file(b"image"),
+        s3_file(b"tags"),
+    ]
+    etag = client.get("/bundle?template=pg/template.yaml").headers["ETag"]
+
+    res = client.get(
+        "/bundle?template=pg/template.yaml", headers={"If-None-Match": etag}
+    )
+
+    assert res.status_code == 304
+
+
+def test_bundle_serves_prebuilt_archive(mock_s3, client):
+    mock_s3.get_object.side_effect = [
+        missing_pointer(mock_s3),
+        yaml_object(b"- postgres\n- nginx"),
+        yaml_object(BUNDLE_INDEX),
+        s3_file(b"prebuilt"),
+    ]
+
+    res = client.get("/bundle?template=nginx/template.yaml")
+
+    assert res.data == b"prebuilt"
+    assert res.mimetype == "application/gzip"
+    assert mock_s3.get_object.call_args.kwargs["Key"] == "bundles/nginx.tar.gz"
+
+
+def test_bundle_unknown_template(mock_s3, client):
+    mock_s3.get_object.side_effect = [
+        missing_pointer(mock_s3),
+        yaml_object(b"- postgres"),
+        yaml_object(BUNDLE_INDEX),
+    ]
+
+    res = client.get("/bundle?template=missing/template.yaml")
+
+    assert res.status_code == 404
@@ -0,0 +1,102 @@
+import random
+from unittest.mock import MagicMock
+
+import pytest
+import requests
+
+from devlaunch import bench
+
+
+def http_response(status_code=200, json=None):
+    response = MagicMock(status_code=status_code)
+    response.json.return_value = json
+    response.iter_content.return_value = [b"data"]
+    return response
+
+
+def test_summarize_reports_percentiles():
+    latencies = [i / 1000 for i in range(1, 101)]
+
+    stats = bench.summarize(latencies, elapsed=2.0, errors=5)
+
+    assert stats["requests"] == 105
+    assert stats["throughput"] == 50.0
+    assert (stats["p50_ms"], stats["p95_ms"], stats["p99_ms"]) == (50, 95, 99)
+
+
+def test_summarize_percentiles_with_odd_sample_count():
+    latencies = [i / 1000 for i in range(1, 12)]
+
+    stats = bench.summarize(latencies, elapsed=1.0)
+
+    assert (stats["p50_ms"], stats["p95_ms"], stats["p99_ms"]) == (6, 11, 11)
+
+
+def test_percentile_uses_nearest_rank():
+    assert bench.percentile([1, 2, 3, 4, 5], 0.5) == 3
+    assert bench.percentile(list(range(1, 11)), 0.25) == 3
+    assert bench.percentile([7], 0.99) == 7
+    assert bench.percentile([], 0.5) is None
+
+
+def test_parse_mix_rejects_unknown_endpoints():
+    assert bench.parse_mix("resolve=3,bundle") == {"resolve": 3.0, "bundle": 1.0}
+    with pytest.raises(ValueError):
+        bench.parse_mix("resolve=1,upload=2")
+    with pytest.raises(ValueError):
+        bench.parse_mix("resolve=0")
+
+
+def test_prompts_are_built_from_catalog_tags():
+    prompts = bench.make_prompts(["docker", "redis"], 5, random.Random(0))
+
+    assert len(prompts) == 5
+    assert all(prompt.startswith("set up ") for prompt in prompts)
+
+
+def test_run_load_counts_errors_per_endpoint():
+    session = MagicMock()
+    session.post.return_value = http_response(200, {"matched": None})
+    session.get.side_effect = [
+        http_response(200),
+        http_response(503),
+        requests.ConnectionError("refused"),
+    ] * 10
+
+    report = bench.run_load(
+        ["set up redis"],
+        ["pg/template.yaml"],
+        ["pg/docker-compose.j2"],
+        {"resolve": 1, "download": 1},
+        concurrency=1,
+        total=40,
+        session_factory=lambda: session,
+    )
+
+    assert report["total"]["requests"] == 40
+    assert report["resolve"]["errors"] == 0
+    download = report["download"]
+    assert download["requests"] == session.get.call_count
+    assert (
+        download["statuses"].get("503", 0)
+        + download["statuses"].get("ConnectionError", 0)
+        == download["errors"]
+    )
+
+
+def test_run_load_skips_endpoints_without_targets():
+    session = MagicMock()
+    session.post.return_value = http_response(200, {"matched": None})
+
+    report = bench.run_load(
+        ["set up redis"],
+        [],
+        [],
+        {"resolve": 1, "bundle": 5},
+        concurrency=2,
+        total=10,
+        session_factory=lambda: session,
+    )
+
+    assert set(report) == {"resolve", "total"}
+    assert session.get.call_count == 0
@@ -0,0 +1,37 @@
+from benchmarks.catalog import generate_catalog, generate_prompts
+from benchmarks.compare import compare
+
+
+def test_synthetic_catalog_is_reproducible(tmp_path):
+    first = generate_catalog(tmp_path / "a", 20, seed=3)
+    second = generate_catalog(tmp_path / "b", 20, seed=3)
+
+    assert first == second
+    assert (tmp_path / "a" / "t000019" / "docker-compose.j2").read_text() == (
+        tmp_path / "b" / "t000019" / "docker-compose.j2"
+    ).read_text()
+    assert generate_prompts(first, 10, seed=3) == generate_prompts(second, 10, seed=3)
+
+
+def test_compare_flags_slower_and_lower_throughput():
+    baseline = {
+        "sizes": {
+            "1000": {
+                "resolve": {"p99_ms": 10.0, "throughput": 100.0, "requests": 50},
+                "indexer": {"full_seconds": 2.0},
+            }
+        }
+    }
+    candidate = {
+        "sizes": {
+            "1000": {
+                "resolve": {"p99_ms": 10.5, "throughput": 80.0, "requests": 500},
+                "indexer": {"full_seconds": 3.0},
+            }
+        }
+    }
+
+    rows, regressions = compare(baseline, candidate, threshold=0.1)
+
+    assert len(rows) == 3
+    assert regressions == ["1000.resolve.throughput", "1000.indexer.full_seconds"]
@@ -0,0 +1,156 @@
+import pytest
+from jinja2 import Environment
+
+from devlaunch import generator
+from devlaunch.templates import cache
+
+
+@pytest.fixture(autouse=True)
+def scaffolds(tmp_path, monkeypatch):
+    root = tmp_path / "scaffolds"
+    (root / "pg").mkdir(parents=True)
+    (root / "pg" / "template.yaml").write_text(
+        "tags: [postgres]\nrequired_inputs: [db]"
+    )
+    (root / "pg" / "docker-compose.j2").write_text(
+        '{% include "common/header.j2" %}\nPOSTGRES_DB={{ db }}'
+    )
+    (root / "common").mkdir()
+    (root / "common" / "header.j2").write_text("# generated")
+    monkeypatch.setattr(generator, "TEMPLATES_DIR", str(root))
+    monkeypatch.setattr(generator, "PROJECTS_DIR", str(tmp_path / "projects"))
+    monkeypatch.setattr(cache, "CACHE_DIR", tmp_path / "cache")
+    monkeypatch.setattr(generator, "_environment", None)
+    return root
+
+
+def render(tmp_path, variables):
+    output = tmp_path / "out" / "docker-compose.yml"
+    generator.render_to_file("pg/docker-compose.j2", variables, str(output))
+    return output.read_text()
+
+
+def test_environment_is_shared_and_supports_includes(tmp_path):
+    first = generator.get_environment()
+
+    assert generator.get_environment() is first
+    assert render(tmp_path, {"db": "app"}) == "# generated\nPOSTGRES_DB=app"
+
+
+def test_bytecode_cache_skips_compilation(tmp_path, monkeypatch):
+    render(tmp_path, {"db": "app"})
+    assert list((cache.CACHE_DIR / "jinja").iterdir())
+
+    # A fresh process (a new Environment) loads the cached bytecode.
+    monkeypatch.setattr(generator, "_environment", None)
+    monkeypatch.setattr(
+        Environment, "compile", lambda *args, **kwargs: pytest.fail("recompiled")
+    )
+    assert render(tmp_path, {"db": "x"}).endswith("POSTGRES_DB=x")
+
+
+def test_generate_file_writes_rendered_compose(tmp_path, monkeypatch):
+    answers = iter(["app", "demo"])
+    monkeypatch.setattr("builtins.input", lambda prompt: next(answers))
+
+    generator.generate_file("pg")
+
+    output = tmp_path / "projects" / "demo" / "docker-compose.yml"
+    assert output.read_text() == "# generated\nPOSTGRES_DB=app"
+
+
+def write_manifest(tmp_path, content):
+    path = tmp_path / "manifest.yaml"
+    path.write_text(content)
+    return str(path)
+
+
+def test_generate_from_manifest_renders_every_project(tmp_path):
+    manifest = write_manifest(
+        tmp_path,
+        """
+variables: {db: shared}
+projects:
+  - {template: pg, project: one}
+  - {template: pg, project: two, variables: {db: own}}
+""",
+    )
+
+    paths = generator.generate_from_manifest(manifest, workers=2)
+
+    assert [open(f"{path}/docker-compose.yml").read() for path in paths] == [
+        "# generated\nPOSTGRES_DB=shared",
+        "# generated\nPOSTGRES_DB=own",
+    ]
+
+
+def test_manifest_is_validated_before_anything_is_written(tmp_path):
+    manifest = write_manifest(
+        tmp_path,
+        """
+projects:
+  - {template: pg, project: ok, variables: {db: x}}
+  - {template: pg, project: no-db}
+  - {template: missing, project: other}
+  - {template: pg, project: ../escape, variables: {db: x}}
+  - {template: pg, project: ok, variables: {db: y}}
+""",
+    )
+
+    with pytest.raises(Exception) as error:
+        generator.generate_from_manifest(manifest)
+
+    message = str(error.value)
+    assert "entry 2 (no-db): missing db" in message
+    assert "template 'missing' not found" in message
+    assert "plain directory name" in message
+    assert "listed twice" in message
+    assert not (tmp_path / "projects").exists()
+
+
+def test_render_project_renders_and_copies_whole_directory(scaffolds, tmp_path):
+    (scaffolds / "pg" / "conf").mkdir()
+    (scaffolds / "pg" / "conf" / "init.sql.j2").write_text("CREATE DATABASE {{ db }};")
+    (scaffolds / "pg" / "conf" / "entrypoint.sh").write_text("#!/bin/sh\n")
+    (scaffolds / "pg" / "conf" / "entrypoint.sh").chmod(0o755)
+
+    written = generator.render_project("pg", "demo", {"db": "app"})
+
+    project = tmp_path / "projects" / "demo"
+    assert sorted(written) == sorted(
+        str(project / name)
+        for name in ("conf/entrypoint.sh", "conf/init.sql", "docker-compose.yml")
+    )
+    assert (project / "conf" / "init.sql").read_text() == "CREATE DATABASE app;"
+    assert (project / "conf" / "entrypoint.sh").stat().st_mode & 0o777 == 0o755
+    assert not (project / "template.yaml").exists()
+    assert not [path for path in project.rglob(".tmp-*")]
+
+
+def test_generate_file_prompts_for_optional_variables(scaffolds, tmp_path, monkeypatch):
+    (scaffolds / "pg" / "docker-compose.j2").write_text(
+        "POSTGRES_DB={{ db }}\nPORT={{ port | default(5432) }}"
+    )
+    asked = []
+    answers = iter(["app", "", "demo"])
+    monkeypatch.setattr(
+        "builtins.input", lambda prompt: asked.append(prompt) or next(answers)
+    )
+
+    generator.generate_file("pg")
+
+    assert asked == ["db: ", "port (optional): ", "Project name: "]
+    output = tmp_path / "projects" / "demo" / "docker-compose.yml"
+    assert output.read_text() == "POSTGRES_DB=app\nPORT=5432"
+
+
+def test_templates_with_syntax_errors_are_rejected(scaffolds, tmp_path, capsys):
+    (scaffolds / "pg" / "docker-compose.j2").write_text("{% if db %}")
+    manifest = write_manifest(
+        tmp_path, "projects: [{template: pg, project: one, variables: {db: x}}]"
+    )
+
+    generator.generate_file("pg")
+    assert "has errors" in capsys.readouterr().out
+    with pytest.raises(Exception, match="entry 1 \\(one\\): template has errors"):
+        generator.generate_from_manifest(manifest)
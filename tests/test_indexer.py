@@ -0,0 +1,386 @@
+import hashlib
+import io
+import json
+import sys
+import tarfile
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+sys.modules["boto3"] = MagicMock()
+
+from devlaunch.storage import LocalStorage, S3Storage
+from server import indexer
+
+
+class NoSuchKey(Exception):
+    pass
+
+
+# Minimal in-memory stand-in for the parts of the S3 client the indexer uses.
+class FakeS3:
+    def __init__(self, files, page_size=1000):
+        self.page_size = page_size
+        self.objects = {}
+        self.gets = []
+        self.exceptions = MagicMock(NoSuchKey=NoSuchKey)
+        for key, content in files.items():
+            self.write(key, content)
+
+    def write(self, key, content):
+        etag = f'"{hashlib.md5(content).hexdigest()}"'
+        self.objects[key] = (content, etag)
+
+    def get_paginator(self, name):
+        contents = [
+            {"Key": key, "Size": len(content), "ETag": etag}
+            for key, (content, etag) in sorted(self.objects.items())
+        ]
+        pages = [
+            {"Contents": contents[i : i + self.page_size]}
+            for i in range(0, len(contents), self.page_size)
+        ]
+        return MagicMock(paginate=lambda **kwargs: pages)
+
+    def get_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise NoSuchKey(Key)
+        self.gets.append(Key)
+        return {"Body": io.BytesIO(self.objects[Key][0])}
+
+    def put_object(self, Bucket, Key, Body):
+        self.write(Key, Body)
+
+    def upload_fileobj(self, fileobj, Bucket, Key):
+        self.write(Key, fileobj.read())
+
+    # Like S3, deleting a missing key is not an error.
+    def delete_object(self, Bucket, Key):
+        self.objects.pop(Key, None)
+
+    def load(self, key):
+        return indexer.yaml.safe_load(self.objects[key][0])
+
+
+@pytest.fixture
+def bucket():
+    fake = FakeS3(
+        {
+            "pg/template.yaml": b"tags: [postgres]",
+            "pg/docker-compose.j2": b"image: postgres",
+            "web/template.yaml": b"tags: [nginx]",
+            "web/docker-compose.yml": b"image: nginx",
+        }
+    )
+    with patch("server.indexer.storage", S3Storage(indexer.BUCKET_NAME, client=fake)):
+        yield fake
+
+
+def test_build_template_artifacts_hashes_and_bundles_prefix(bucket):
+    objects = [
+        {"Key": "pg/docker-compose.j2", "Size": 15, "ETag": '"a"'},
+        {"Key": "pg/template.yaml", "Size": 16, "ETag": '"b"'},
+    ]
+
+    manifest, bundle = indexer.build_template_artifacts("pg/", objects)
+
+    assert manifest[0] == {
+        "key": "pg/docker-compose.j2",
+        "size": 15,
+        "etag": '"a"',
+        "sha256": hashlib.sha256(b"image: postgres").hexdigest(),
+    }
+    with tarfile.open(fileobj=bundle, mode="r:gz") as tar:
+        assert tar.getnames() == ["docker-compose.j2", "template.yaml"]
+        assert tar.extractfile("template.yaml").read() == b"tags: [postgres]"
+
+
+def test_objects_under_skips_published_keys():
+    objects = [
+        {"Key": "bundles/pg.tar.gz"},
+        {"Key": "index.yaml"},
+        {"Key": "pg/template.yaml"},
+        {"Key": "pgadmin/template.yaml"},
+    ]
+    keys = [obj["Key"] for obj in objects]
+
+    assert indexer.objects_under("pg/", objects, keys) == [objects[2]]
+    assert indexer.objects_under("", objects, keys) == objects[2:]
+
+
+def test_main_publishes_index_with_manifests(bucket):
+    indexer.main()
+
+    index = bucket.load(indexer.INDEX_OUTPUT_KEY)
+    assert [entry["url"] for entry in index] == [
+        "pg/template.yaml",
+        "web/template.yaml",
+    ]
+    assert [item["key"] for item in index[0]["files"]] == [
+        "pg/docker-compose.j2",
+        "pg/template.yaml",
+    ]
+    assert index[0]["bundle"]["key"].startswith("bundles/pg-")
+    assert index[0]["bundle"]["key"] in bucket.objects
+    assert bucket.load(indexer.TAGS_OUTPUT_KEY) == ["nginx", "postgres"]
+    assert json.loads(bucket.objects[indexer.STATE_KEY][0])["version"] == 1
+
+
+def test_main_publishes_versioned_catalog(bucket):
+    indexer.main()
+    bucket.write("web/template.yaml", b"tags: [nginx, docker]")
+    indexer.main()
+
+    pointer = json.loads(bucket.objects[indexer.CATALOG_POINTER_KEY][0])
+    artifact = json.loads(bucket.objects[pointer["key"]][0])
+
+    assert pointer["version"] == artifact["version"] == 2
+    assert pointer["key"] == "catalog/v2.json"
+    assert "catalog/v1.json" in bucket.objects
+    assert artifact["tags"] == ["docker", "nginx", "postgres"]
+    assert [entry["tags"] for entry in artifact["templates"]] == [[2], [0, 1]]
+    assert artifact["postings"] == [[1], [1], [0]]
+
+
+def test_main_drops_old_catalog_versions(bucket, monkeypatch):
+    monkeypatch.setattr(indexer, "CATALOG_KEEP_VERSIONS", 1)
+    indexer.main()
+    indexer.main(full=True)
+
+    assert "catalog/v1.json" not in bucket.objects
+    assert "catalog/v2.json" in bucket.objects
+
+
+def test_main_refetches_only_changed_templates(bucket):
+    indexer.main()
+    bucket.gets.clear()
+    bucket.write("pg/template.yaml", b"tags: [postgres, docker]")
+
+    indexer.main()
+
+    fetched = [key for key in bucket.gets if key != indexer.STATE_KEY]
+    assert sorted(set(fetched)) == ["pg/docker-compose.j2", "pg/template.yaml"]
+    assert bucket.load(indexer.TAGS_OUTPUT_KEY) == ["docker", "nginx", "postgres"]
+    assert json.loads(bucket.objects[indexer.STATE_KEY][0])["version"] == 2
+
+
+def test_each_template_file_is_fetched_once(bucket):
+    indexer.main()
+
+    fetched = [key for key in bucket.gets if not key.startswith("catalog/")]
+    assert sorted(key for key in fetched if key != indexer.STATE_KEY) == [
+        "pg/docker-compose.j2",
+        "pg/template.yaml",
+        "web/docker-compose.yml",
+        "web/template.yaml",
+    ]
+
+
+def test_main_skips_publish_when_nothing_changed(bucket):
+    indexer.main()
+    index_etag = bucket.objects[indexer.INDEX_OUTPUT_KEY][1]
+    bucket.gets.clear()
+
+    indexer.main()
+
+    assert bucket.gets == [indexer.STATE_KEY]
+    assert bucket.objects[indexer.INDEX_OUTPUT_KEY][1] == index_etag
+    assert json.loads(bucket.objects[indexer.STATE_KEY][0])["version"] == 1
+
+
+def test_main_drops_deleted_templates(bucket, monkeypatch):
+    monkeypatch.setattr(indexer, "CATALOG_KEEP_VERSIONS", 1)
+    indexer.main()
+    web_bundle = bucket.load(indexer.INDEX_OUTPUT_KEY)[1]["bundle"]["key"]
+    del bucket.objects["web/template.yaml"]
+    del bucket.objects["web/docker-compose.yml"]
+
+    indexer.main()
+
+    assert [entry["url"] for entry in bucket.load(indexer.INDEX_OUTPUT_KEY)] == [
+        "pg/template.yaml"
+    ]
+    assert web_bundle not in bucket.objects
+
+
+def test_changed_bundle_gets_new_key_and_old_one_outlives_catalogs(bucket):
+    indexer.main()
+    first = bucket.load(indexer.INDEX_OUTPUT_KEY)[0]["bundle"]["key"]
+    first_body = bucket.objects[first][0]
+
+    bucket.write("pg/docker-compose.j2", b"image: postgres:16")
+    indexer.main()
+    second = bucket.load(indexer.INDEX_OUTPUT_KEY)[0]["bundle"]["key"]
+
+    # Catalog v1 still points at the first bundle, which is left untouched.
+    assert second != first
+    assert bucket.objects[first][0] == first_body
+    for i in range(indexer.CATALOG_KEEP_VERSIONS - 2):
+        bucket.write("web/template.yaml", f"tags: [nginx, v{i}]".encode())
+        indexer.main()
+    assert first in bucket.objects
+
+    bucket.write("web/template.yaml", b"tags: [nginx]")
+    indexer.main()
+    assert "catalog/v1.json" not in bucket.objects
+    assert first not in bucket.objects
+    assert second in bucket.objects
+
+
+def test_templates_are_yielded_once_listing_moves_past_them(bucket):
+    bucket.page_size = 2
+    listed = []
+
+    for key, template_objects in indexer.iter_listed_templates([], []):
+        listed.append((key, [obj["Key"] for obj in template_objects]))
+
+    assert listed == [
+        ("pg/template.yaml", ["pg/docker-compose.j2", "pg/template.yaml"]),
+        ("web/template.yaml", ["web/docker-compose.yml", "web/template.yaml"]),
+    ]
+
+
+def test_main_reports_errors_without_stopping(bucket):
+    bucket.write("broken/template.yaml", b"description: no tags")
+
+    stats = indexer.main()
+
+    assert list(stats["errors"]) == ["broken/template.yaml"]
+    assert stats["changed"] == 2
+    assert [entry["url"] for entry in bucket.load(indexer.INDEX_OUTPUT_KEY)] == [
+        "pg/template.yaml",
+        "web/template.yaml",
+    ]
+
+
+def test_failed_reindex_keeps_previous_entry(tmp_path, monkeypatch):
+    for name, content in [
+        ("pg/template.yaml", b"tags: [postgres]"),
+        ("pg/a.j2", b"image: postgres"),
+        ("web/template.yaml", b"tags: [nginx]"),
+    ]:
+        (tmp_path / name).parent.mkdir(exist_ok=True)
+        (tmp_path / name).write_bytes(content)
+    build = indexer.build_template_artifacts
+
+    def fail_pg(prefix, *args, **kwargs):
+        if prefix == "pg/":
+            raise Exception("storage hiccup")
+        return build(prefix, *args, **kwargs)
+
+    with patch("server.indexer.storage", LocalStorage(tmp_path)):
+        indexer.main()
+        (tmp_path / "pg" / "a.j2").write_bytes(b"image: postgres:16")
+        (tmp_path / "web" / "template.yaml").write_bytes(b"tags: [nginx, docker]")
+        monkeypatch.setattr(indexer, "build_template_artifacts", fail_pg)
+        stats = indexer.main()
+        index = indexer.yaml.safe_load(
+            (tmp_path / indexer.INDEX_OUTPUT_KEY).read_bytes()
+        )
+
+    assert list(stats["errors"]) == ["pg/template.yaml"]
+    assert stats["removed"] == 0
+    assert stats["published"]
+    assert [entry["url"] for entry in index] == [
+        "pg/template.yaml",
+        "web/template.yaml",
+    ]
+    assert (tmp_path / index[0]["bundle"]["key"]).exists()
+
+
+def test_failed_reindex_keeps_pre_schema_entry(bucket):
+    old_entry = {"tags": ["postgres"], "url": "pg/template.yaml", "files": []}
+    bucket.write(
+        indexer.STATE_KEY,
+        json.dumps(
+            {"version": 3, "templates": {"pg/template.yaml": old_entry}}
+        ).encode(),
+    )
+    bucket.write("pg/template.yaml", b"description: tags went missing")
+
+    stats = indexer.main()
+
+    assert list(stats["errors"]) == ["pg/template.yaml"]
+    assert stats["invalid"] == []
+    assert [entry["url"] for entry in bucket.load(indexer.INDEX_OUTPUT_KEY)] == [
+        "pg/template.yaml",
+        "web/template.yaml",
+    ]
+
+
+def test_synonyms_change_republishes_catalog(bucket):
+    indexer.main()
+    bucket.write(indexer.SYNONYMS_KEY, b"postgresql: postgres")
+
+    stats = indexer.main()
+
+    pointer = json.loads(bucket.objects[indexer.CATALOG_POINTER_KEY][0])
+    artifact = json.loads(bucket.objects[pointer["key"]][0])
+    assert stats["published"]
+    assert artifact["synonyms"] == {"postgresql": "postgres"}
+
+
+def test_main_indexes_local_directory(tmp_path):
+    (tmp_path / "pg").mkdir()
+    (tmp_path / "pg" / "template.yaml").write_bytes(b"tags: [postgres]")
+    (tmp_path / "pg" / "docker-compose.j2").write_bytes(b"image: postgres")
+
+    with patch("server.indexer.storage", LocalStorage(tmp_path)):
+        stats = indexer.main()
+        again = indexer.main()
+
+    pointer = json.loads((tmp_path / indexer.CATALOG_POINTER_KEY).read_bytes())
+    artifact = json.loads((tmp_path / pointer["key"]).read_bytes())
+    assert stats["changed"] == 1
+    assert not again["published"]
+    bundle = artifact["templates"][0]["bundle"]["key"]
+    assert bundle.startswith("bundles/pg-")
+    assert (tmp_path / bundle).exists()
+
+
+def test_index_records_template_schema(bucket):
+    bucket.write("pg/template.yaml", b"tags: [postgres]\nrequired_inputs: [db]")
+    bucket.write(
+        "pg/docker-compose.j2", b"db: {{ db }}\nport: {{ port | default(5432) }}"
+    )
+    bucket.write("web/docker-compose.j2", b"{% if %}")
+
+    stats = indexer.main()
+
+    pg, web = bucket.load(indexer.INDEX_OUTPUT_KEY)
+    assert pg["required_inputs"] == ["db"]
+    assert pg["variables"] == ["db", "port"]
+    assert pg["valid"] and "errors" not in pg
+    assert not web["valid"]
+    assert web["errors"][0].startswith("docker-compose.j2:1:")
+    assert stats["invalid"] == ["web/template.yaml"]
+
+
+def test_inputs_that_disagree_with_templates_are_warnings(bucket):
+    bucket.write("pg/template.yaml", b"tags: [postgres]\nrequired_inputs: [db, gone]")
+    bucket.write(
+        "pg/docker-compose.j2",
+        b"{{ db }} {{ user }} {{ port | default(5432) }}{% for x in xs %}{% endfor %}",
+    )
+
+    stats = indexer.main()
+
+    pg, web = bucket.load(indexer.INDEX_OUTPUT_KEY)
+    assert pg["valid"]
+    assert pg["warnings"] == [
+        "required input gone is not used by any file",
+        "variable user has no default and is not a required input",
+        "variable xs has no default and is not a required input",
+    ]
+    assert "warnings" not in web
+    assert stats["warnings"] == {"pg/template.yaml": pg["warnings"]}
+
+
+def test_entries_without_schema_are_reindexed(bucket):
+    indexer.main()
+    state = json.loads(bucket.objects[indexer.STATE_KEY][0])
+    for entry in state["templates"].values():
+        del entry["valid"]
+    bucket.write(indexer.STATE_KEY, json.dumps(state).encode())
+
+    assert indexer.main()["changed"] == 2
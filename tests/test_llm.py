@@ -0,0 +1,247 @@
+import json
+import os
+import time
+
+import pytest
+
+from devlaunch import llm
+from devlaunch.llm_cache import ResponseCache, response_key
+from devlaunch.templates import cache
+
+query_openrouter = llm.query_openrouter
+
+ANSWER = "services: {}\n---END_METADATA---\ndescription: test"
+
+
+@pytest.fixture(autouse=True)
+def config(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "CACHE_DIR", tmp_path / "cache")
+    monkeypatch.setattr(
+        llm,
+        "load_config",
+        lambda: {"llm_config": "openrouter", "openrouter_api_key": "key"},
+    )
+    calls = []
+
+    def query_openrouter(prompt, api_key, model, on_text=None):
+        calls.append(prompt)
+        return ANSWER
+
+    monkeypatch.setattr(llm, "query_openrouter", query_openrouter)
+    return calls
+
+
+def test_repeated_prompt_is_served_from_cache(config):
+    assert llm.query_llm("Postgres  with Redis") == ANSWER
+    assert llm.query_llm("postgres with redis\n") == ANSWER
+
+    assert config == ["Postgres  with Redis"]
+
+
+def test_bypass_queries_again_and_refreshes(config):
+    llm.query_llm("postgres")
+    llm.query_llm("postgres", use_cache=False)
+
+    assert len(config) == 2
+
+
+def test_cached_local_answer_needs_no_ollama(monkeypatch):
+    config = {"llm_config": "local", "local_model": "m", "ollama_url": "http://o"}
+    monkeypatch.setattr(llm, "load_config", lambda: config)
+    checks = []
+    monkeypatch.setattr(llm, "check_ollama_installed", lambda: checks.append(1) or 1)
+    monkeypatch.setattr(llm, "query_local", lambda *a: ANSWER)
+    llm.query_llm("postgres")
+    monkeypatch.setattr(llm, "check_ollama_installed", lambda: False)
+
+    assert llm.query_llm("postgres") == ANSWER
+    assert checks == [1]
+    with pytest.raises(Exception, match="not installed"):
+        llm.query_llm("redis")
+
+
+def test_answer_without_separator_is_not_cached(config, monkeypatch):
+    monkeypatch.setattr(llm, "query_openrouter", lambda *a: config.append(1) or "?")
+    llm.query_llm("postgres")
+    llm.query_llm("postgres")
+
+    assert len(config) == 2
+
+
+def test_key_depends_on_model_and_system_prompt():
+    key = response_key("postgres", "openrouter", "a", "system")
+
+    assert key == response_key(" POSTGRES ", "openrouter", "a", "system")
+    assert key != response_key("postgres", "openrouter", "b", "system")
+    assert key != response_key("postgres", "openrouter", "a", "other")
+    assert key != response_key("postgres", "local", "a", "system")
+
+
+def test_expired_entries_are_ignored_and_pruned(tmp_path):
+    responses = ResponseCache(tmp_path, ttl=60)
+    responses.put("old", ANSWER)
+    responses.put("new", ANSWER)
+    size = os.path.getsize(responses.path("old"))
+    past = time.time() - 120
+    os.utime(responses.path("old"), (past, past))
+
+    assert responses.get("old") is None
+    assert responses.get("new") == ANSWER
+    assert responses.prune() == (1, size)
+    assert not responses.path("old").exists()
+
+
+def test_oldest_entries_go_first_when_over_size(tmp_path):
+    responses = ResponseCache(tmp_path)
+    for i, key in enumerate(["a", "b", "c"]):
+        responses.put(key, ANSWER)
+        stamp = time.time() - 100 + i
+        os.utime(responses.path(key), (stamp, stamp))
+    size = sum(os.path.getsize(responses.path(key)) for key in ["b", "c"])
+
+    responses.prune(max_size=size)
+
+    assert [p.stem for p in sorted(tmp_path.iterdir())] == ["b", "c"]
+    assert responses.clear() == (2, size)
+
+
+class FakeStream:
+    def __init__(self, lines):
+        self.lines = lines
+        self.read = 0
+        self.closed = False
+
+    def raise_for_status(self):
+        pass
+
+    def iter_lines(self):
+        for line in self.lines:
+            self.read += 1
+            yield line.encode()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.closed = True
+
+
+def sse(content):
+    return "data: " + json.dumps({"choices": [{"delta": {"content": content}}]})
+
+
+def feed_all(chunks):
+    shown = []
+    stream = llm.CompletionStream(shown.append)
+    for chunk in chunks:
+        if stream.feed(chunk):
+            break
+    return stream.finish(), "".join(shown)
+
+
+def test_stream_stops_after_complete_metadata():
+    text, shown = feed_all(
+        [
+            "services: {}\n---END_",
+            "METADATA---\ndescription: db\nrequired_inputs:\n  - A\n",
+            "  - B\n\nHere is an explanation of the template...",
+            "never read",
+        ]
+    )
+
+    assert text == (
+        "services: {}\n---END_METADATA---\n"
+        "description: db\nrequired_inputs:\n  - A\n  - B"
+    )
+    assert shown == text + "\n"
+
+
+def test_stream_keeps_incomplete_metadata_open():
+    text, _ = feed_all(
+        ["x\n---END_METADATA---\n", "description: db\n\n", "required_inputs: [A]"]
+    )
+
+    assert text.endswith("description: db\n\nrequired_inputs: [A]")
+
+
+def test_blank_line_before_list_items_keeps_metadata_open():
+    text, _ = feed_all(
+        [
+            "x\n---END_METADATA---\ndescription: db\nrequired_inputs:\n\n",
+            "  - USER\n  - PASS\n\nThanks!",
+        ]
+    )
+    metadata = text.split(llm.METADATA_SEPARATOR)[1]
+
+    assert llm.yaml.safe_load(metadata)["required_inputs"] == ["USER", "PASS"]
+    assert "Thanks" not in text
+
+
+def test_key_without_value_is_not_complete():
+    assert not llm.metadata_complete("description: db\nrequired_inputs:\n")
+    assert not llm.metadata_complete("required_inputs: [A]\ndescription:\n")
+    assert not llm.metadata_complete("description: db\nrequired_inputs: []\nports:")
+    assert llm.metadata_complete("description: db\nrequired_inputs:\n  - A\n")
+
+
+def test_openrouter_streams_and_closes_early(monkeypatch):
+    response = FakeStream(
+        [
+            ": OPENROUTER PROCESSING",
+            sse("services: {}\n"),
+            sse("---END_METADATA---\ndescription: db\n"),
+            sse("required_inputs: []\n"),
+            sse("```\n"),
+            sse("more"),
+            "data: [DONE]",
+        ]
+    )
+    requests_made = []
+
+    def post(url, **kwargs):
+        requests_made.append(kwargs)
+        return response
+
+    monkeypatch.setattr(llm.requests, "post", post)
+    shown = []
+
+    text = query_openrouter("db", "key", "model", shown.append)
+
+    assert text.endswith("description: db\nrequired_inputs: []")
+    assert requests_made[0]["json"]["stream"] and requests_made[0]["stream"]
+    assert response.closed and response.read == 5
+    assert "".join(shown).strip() == text
+
+
+def test_ollama_streams_ndjson(monkeypatch):
+    events = [{"response": "services: {}\n"}, {"response": "done"}, {"done": True}]
+    response = FakeStream([json.dumps(event) for event in events] + ["", "{}"])
+    monkeypatch.setattr(llm.requests, "post", lambda url, **kwargs: response)
+
+    assert llm.query_local("db", "llama3", "http://ollama") == "services: {}\ndone"
+    assert response.read == 3
+
+
+def test_ollama_error_is_raised(monkeypatch):
+    response = FakeStream([json.dumps({"error": "model 'x' not found"})])
+    monkeypatch.setattr(llm.requests, "post", lambda url, **kwargs: response)
+
+    with pytest.raises(Exception, match="not found"):
+        llm.query_local("db", "x", "http://ollama")
+
+
+def test_cached_answer_is_shown(config):
+    llm.query_llm("postgres")
+    shown = []
+
+    assert llm.query_llm("postgres", on_text=shown.append) == ANSWER
+    assert shown == [ANSWER]
+
+
+def test_unterminated_prose_after_metadata_is_dropped():
+    text, shown = feed_all(
+        ["x\n---END_METADATA---\ndescription: db\nrequired_inputs: []\n", "Enjoy!"]
+    )
+
+    assert text.endswith("required_inputs: []")
+    assert "Enjoy" not in shown
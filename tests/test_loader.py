@@ -0,0 +1,256 @@
+import hashlib
+import io
+import json
+import tarfile
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest.mock import MagicMock
+
+import pytest
+import requests
+
+from devlaunch import loader
+from devlaunch.templates import cache
+
+
+def make_bundle(files):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as tar:
+        for name, content in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            tar.addfile(info, io.BytesIO(content))
+    buffer.seek(0)
+    return buffer
+
+
+def http_response(status_code=200, json=None, content=b"", raw=None, headers=None):
+    response = MagicMock(status_code=status_code, raw=raw, headers=headers or {})
+    response.json.return_value = json
+    response.iter_content.return_value = [content]
+    response.__enter__.return_value = response
+    return response
+
+
+def sha256(content):
+    return hashlib.sha256(content).hexdigest()
+
+
+RESOLVED = {
+    "matched": {"tags": ["postgres"], "url": "pg/template.yaml"},
+    "files": ["pg/docker-compose.j2", "pg/template.yaml"],
+    "manifest": [
+        {"key": "pg/docker-compose.j2", "sha256": sha256(b"image")},
+        {"key": "pg/template.yaml", "sha256": sha256(b"tags")},
+    ],
+}
+
+FILES = {"pg/docker-compose.j2": b"image", "pg/template.yaml": b"tags"}
+
+
+@pytest.fixture
+def templates_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(loader, "TEMPLATES_DIR", str(tmp_path / "scaffolds"))
+    return tmp_path / "scaffolds"
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "CACHE_DIR", tmp_path / "cache")
+    return tmp_path / "cache"
+
+
+@pytest.fixture
+def session(monkeypatch):
+    session = MagicMock()
+    session.post.return_value = http_response(json=RESOLVED)
+    monkeypatch.setattr(loader, "get_session", lambda: session)
+    monkeypatch.setattr(loader, "DOWNLOAD_BACKOFF", 0)
+    return session
+
+
+# failures drop the connection while the body is read; errors raise from
+# get() itself, as the adapter does once its own retries are used up.
+def serve_files(bundle_status=404, failures=None, errors=None):
+    failures = dict(failures or {})
+    errors = dict(errors or {})
+
+    def get(url, params=None, **kwargs):
+        if url.endswith("/bundle"):
+            return http_response(status_code=bundle_status)
+        key = params["key"]
+        if key in errors:
+            raise errors[key]
+        response = http_response(content=FILES[key])
+        if failures.get(key):
+            failures[key] -= 1
+            response.iter_content.side_effect = requests.ConnectionError("reset")
+        return response
+
+    return get
+
+
+def test_download_extracts_bundle_in_one_request(session, templates_dir):
+    session.get.return_value = http_response(
+        raw=make_bundle({"docker-compose.j2": b"image", "template.yaml": b"tags"})
+    )
+
+    path = loader.download_template_logic("postgres")
+
+    assert path == str(templates_dir / "pg")
+    assert (templates_dir / "pg" / "docker-compose.j2").read_bytes() == b"image"
+    assert session.get.call_count == 1
+
+
+def test_download_rejects_bundle_with_bad_checksum(session, templates_dir):
+    session.get.return_value = http_response(
+        raw=make_bundle({"docker-compose.j2": b"tampered"})
+    )
+
+    with pytest.raises(Exception, match="Checksum mismatch"):
+        loader.download_template_logic("postgres")
+
+    assert not (templates_dir / "pg" / "docker-compose.j2").exists()
+
+
+def test_download_refuses_templates_flagged_invalid(session, templates_dir):
+    matched = dict(RESOLVED["matched"], valid=False, errors=["docker-compose.j2:3: x"])
+    session.post.return_value = http_response(json=dict(RESOLVED, matched=matched))
+
+    with pytest.raises(Exception, match="failed validation.*docker-compose.j2:3"):
+        loader.download_template_logic("postgres")
+
+    assert session.get.call_count == 0
+
+
+def test_download_falls_back_to_parallel_files(session, templates_dir):
+    session.get.side_effect = serve_files()
+
+    loader.download_template_logic("postgres")
+
+    assert (templates_dir / "pg" / "template.yaml").read_bytes() == b"tags"
+    assert (templates_dir / "pg" / "docker-compose.j2").read_bytes() == b"image"
+    assert session.get.call_count == 3
+
+
+def test_download_retries_dropped_connections(session, templates_dir):
+    session.get.side_effect = serve_files(failures={"pg/template.yaml": 2})
+
+    loader.download_template_logic("postgres")
+
+    assert (templates_dir / "pg" / "template.yaml").read_bytes() == b"tags"
+    assert session.get.call_count == 5
+
+
+def test_download_gives_up_after_retries(session, templates_dir):
+    session.get.side_effect = serve_files(failures={"pg/template.yaml": 10})
+
+    with pytest.raises(requests.ConnectionError):
+        loader.download_template_logic("postgres")
+
+
+def test_download_leaves_request_retries_to_the_adapter(session, templates_dir):
+    retried = requests.exceptions.RetryError("too many 503 error responses")
+    session.get.side_effect = serve_files(errors={"pg/template.yaml": retried})
+
+    with pytest.raises(requests.exceptions.RetryError):
+        loader.download_template_logic("postgres")
+
+    keys = [call.kwargs["params"]["key"] for call in session.get.call_args_list[1:]]
+    assert keys.count("pg/template.yaml") == 1
+
+
+def test_api_error_is_shown_after_status_retries(monkeypatch):
+    class Failing(BaseHTTPRequestHandler):
+        calls = 0
+
+        def do_POST(self):
+            Failing.calls += 1
+            body = json.dumps({"error": "index is rebuilding"}).encode()
+            self.send_response(503)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Failing)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(loader, "API_URL", f"http://127.0.0.1:{server.server_port}")
+    monkeypatch.setattr(loader, "DOWNLOAD_BACKOFF", 0)
+    monkeypatch.setattr(loader, "_session", None)
+    try:
+        with pytest.raises(Exception, match="index is rebuilding"):
+            loader.resolve_batch(["postgres"])
+    finally:
+        server.shutdown()
+        server.server_close()
+        loader._session = None
+
+    assert Failing.calls == loader.DOWNLOAD_RETRIES + 1
+
+
+def test_repeat_download_is_served_from_cache(session, templates_dir):
+    session.get.return_value = http_response(
+        raw=make_bundle({"docker-compose.j2": b"image", "template.yaml": b"tags"})
+    )
+    loader.download_template_logic("postgres")
+    (templates_dir / "pg" / "docker-compose.j2").unlink()
+
+    loader.download_template_logic("postgres")
+
+    assert (templates_dir / "pg" / "docker-compose.j2").read_bytes() == b"image"
+    assert session.get.call_count == 1
+    assert session.post.call_count == 2
+
+
+def test_bundle_revalidates_with_etag_without_manifest(session, templates_dir):
+    session.post.return_value = http_response(
+        json={key: value for key, value in RESOLVED.items() if key != "manifest"}
+    )
+    session.get.side_effect = [
+        http_response(
+            raw=make_bundle({"docker-compose.j2": b"image"}), headers={"ETag": '"b1"'}
+        ),
+        http_response(status_code=304),
+    ]
+    loader.download_template_logic("postgres")
+    (templates_dir / "pg" / "docker-compose.j2").write_bytes(b"edited")
+
+    loader.download_template_logic("postgres")
+
+    assert session.get.call_args.kwargs["headers"] == {"If-None-Match": '"b1"'}
+    assert (templates_dir / "pg" / "docker-compose.j2").read_bytes() == b"image"
+
+
+def test_prune_evicts_least_recently_used_blobs(tmp_path):
+    store = cache.TemplateCache(root=tmp_path / "cache", max_size=8)
+    for name, content in [("old", b"aaaaa"), ("new", b"bbbbb")]:
+        path = tmp_path / name
+        path.write_bytes(content)
+        store.store(str(path), sha256(content))
+        store.remember_key(f"pg/{name}", '"etag"', sha256(content))
+
+    removed, freed = store.prune()
+
+    assert (removed, freed) == (1, 5)
+    assert not store.has(sha256(b"aaaaa"))
+    assert store.has(sha256(b"bbbbb"))
+    assert store.lookup_key("pg/old") is None
+    assert cache.TemplateCache(root=tmp_path / "cache").index["keys"].keys() == {
+        "pg/new"
+    }
+
+
+def test_resolve_batch_splits_large_batches(session, monkeypatch):
+    monkeypatch.setattr(loader, "RESOLVE_BATCH_SIZE", 2)
+    session.post.side_effect = lambda url, json, **kwargs: http_response(
+        json={"results": [{"prompt": prompt} for prompt in json["prompts"]]}
+    )
+
+    results = loader.resolve_batch(["a", "b", "c"], top_k=1)
+
+    assert [r["prompt"] for r in results] == ["a", "b", "c"]
+    assert session.post.call_count == 2
+    assert session.post.call_args.kwargs["json"] == {"prompts": ["c"], "top_k": 1}
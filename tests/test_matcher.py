@@ -0,0 +1,42 @@
+import pytest
+
+from api.matcher import build_tag_matcher, edit_distance, match_tags
+
+TAGS = ["docker", "docker-compose", "postgres", "node-js", "nginx", "redis"]
+
+
+@pytest.fixture(scope="module")
+def matcher():
+    return build_tag_matcher(TAGS, {"web server": "nginx", "cache": "missing"})
+
+
+@pytest.mark.parametrize(
+    "prompt, expected",
+    [
+        ("Use docker and postgres", {"docker", "postgres"}),
+        ("a docker compose stack", {"docker-compose"}),
+        ("Docker-Compose with Node.js", {"docker-compose", "node-js"}),
+        ("plain nodejs app", {"node-js"}),
+        ("postgress please", {"postgres"}),
+        ("dokcer with redis", {"docker", "redis"}),
+        ("PostgreSQL behind a web server", {"postgres", "nginx"}),
+        ("unknown technology", set()),
+    ],
+)
+def test_match_tags(matcher, prompt, expected):
+    assert match_tags(prompt, matcher) == expected
+
+
+def test_short_words_are_not_fuzzy_matched():
+    matcher = build_tag_matcher(["ant"])
+    assert match_tags("this and that", matcher) == set()
+
+
+def test_synonyms_for_unknown_tags_are_ignored(matcher):
+    assert match_tags("add a cache", matcher) == set()
+
+
+def test_edit_distance_counts_transpositions_once():
+    assert edit_distance("dokcer", "docker") == 1
+    assert edit_distance("postgress", "postgres") == 1
+    assert edit_distance("nginx", "redis") > 1
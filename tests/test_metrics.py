@@ -0,0 +1,115 @@
+from flask import Flask
+
+from api import metrics
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = metrics.Histogram("latency_seconds", "Latency.", ("route",), (0.1, 1))
+    histogram.observe(0.05, route="/a")
+    histogram.observe(0.5, route="/a")
+    histogram.observe(5, route="/a")
+
+    samples = {
+        (name, tuple(labels)): value for name, labels, value in histogram.samples()
+    }
+
+    assert samples[("latency_seconds_bucket", (("route", "/a"), ("le", "0.1")))] == 1
+    assert samples[("latency_seconds_bucket", (("route", "/a"), ("le", "1")))] == 2
+    assert samples[("latency_seconds_bucket", (("route", "/a"), ("le", "+Inf")))] == 3
+    assert samples[("latency_seconds_count", (("route", "/a"),))] == 3
+    assert samples[("latency_seconds_sum", (("route", "/a"),))] == 5.55
+
+
+def test_labels_are_escaped():
+    assert metrics.format_labels([("version", 'a"b\\c')]) == '{version="a\\"b\\\\c"}'
+
+
+def test_server_timing_header_sums_repeated_stages():
+    app = Flask(__name__)
+    metrics.init_app(app, [lambda: [metrics.family("extra", "gauge", "Extra.", 7)]])
+
+    @app.route("/work")
+    def work():
+        for _ in range(2):
+            with metrics.stage("storage_get"):
+                pass
+        return "ok"
+
+    with app.test_client() as client:
+        res = client.get("/work")
+        body = client.get("/metrics").get_data(as_text=True)
+
+    entries = res.headers["Server-Timing"].split(", ")
+    assert [entry.split(";")[0] for entry in entries] == ["storage_get", "total"]
+    assert "# TYPE extra gauge\nextra 7" in body
+    assert 'devlaunch_request_duration_seconds_count{route="/work"' in body
+
+
+def test_forked_child_gets_fresh_locks_and_no_parent_values():
+    metrics.STORAGE_REQUESTS.inc(operation="get")
+    inherited = [metric.lock for metric in metrics.METRICS]
+    inherited[0].acquire()
+    try:
+        metrics.reset_after_fork()
+    finally:
+        inherited[0].release()
+
+    assert all(
+        metric.lock is not lock for metric, lock in zip(metrics.METRICS, inherited)
+    )
+    assert metrics.STORAGE_REQUESTS.snapshot() == {}
+    metrics.REQUEST_SECONDS.observe(0.1, route="/", method="GET", status=200)
+
+
+def worker_snapshot(directory, pid, requests, latency):
+    counter = metrics.Counter("devlaunch_storage_requests_total", "", ("operation",))
+    histogram = metrics.Histogram("devlaunch_stage_duration_seconds", "", ("stage",))
+    counter.inc(requests, operation="get")
+    histogram.observe(latency, stage="parse")
+    metrics.write_snapshot(
+        metrics.snapshot_path(pid, directory),
+        {counter.name: counter.snapshot(), histogram.name: histogram.snapshot()},
+    )
+
+
+def test_scrape_sums_every_worker_snapshot(tmp_path):
+    metrics.reset_after_fork()
+    metrics.STORAGE_REQUESTS.inc(operation="get")
+    worker_snapshot(tmp_path, 101, 2, 0.2)
+    worker_snapshot(tmp_path, 102, 4, 0.4)
+
+    text = metrics.render(directory=str(tmp_path))
+
+    assert 'devlaunch_storage_requests_total{operation="get"} 7' in text
+    assert 'devlaunch_stage_duration_seconds_count{stage="parse"} 2' in text
+    assert 'devlaunch_stage_duration_seconds_sum{stage="parse"} 0.6' in text
+    # What this scrape reported is on disk for the next one, whoever serves it.
+    own = metrics.load_snapshot(metrics.snapshot_path(directory=str(tmp_path)))
+    assert own["devlaunch_storage_requests_total"] == {("get",): 1}
+
+
+def test_exited_workers_are_archived_without_losing_counts(tmp_path):
+    metrics.reset_after_fork()
+    worker_snapshot(tmp_path, 101, 2, 0.2)
+    worker_snapshot(tmp_path, 102, 4, 0.4)
+
+    metrics.archive_process(101, str(tmp_path))
+    metrics.archive_process(102, str(tmp_path))
+    metrics.archive_process(103, str(tmp_path))
+
+    assert sorted(p.name for p in tmp_path.glob("*.json")) == ["archive.json"]
+    text = metrics.render(directory=str(tmp_path))
+    assert 'devlaunch_storage_requests_total{operation="get"} 6' in text
+
+    metrics.clear_dir(str(tmp_path))
+    assert not list(tmp_path.glob("*.json"))
+
+
+def test_flush_writes_this_process_snapshot(tmp_path):
+    metrics.reset_after_fork()
+    metrics.STORAGE_BYTES.inc(10, operation="get")
+
+    metrics.flush(str(tmp_path))
+
+    snapshot = metrics.load_snapshot(metrics.snapshot_path(directory=str(tmp_path)))
+    assert snapshot["devlaunch_storage_bytes_total"] == {("get",): 10}
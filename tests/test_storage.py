@@ -0,0 +1,72 @@
+import pytest
+
+from devlaunch.storage import InvalidRange, LocalStorage, NotFound, NotModified
+
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = LocalStorage(tmp_path)
+    storage.put("pg/template.yaml", b"tags: [postgres]")
+    storage.put("pg/docker-compose.j2", b"image: postgres")
+    storage.put("index.yaml", b"[]")
+    return storage
+
+
+def test_list_returns_sorted_keys_under_prefix(storage):
+    pages = list(storage.list("pg/"))
+
+    assert [obj["Key"] for obj in pages[0]] == [
+        "pg/docker-compose.j2",
+        "pg/template.yaml",
+    ]
+    assert pages[0][0]["Size"] == 15
+    assert list(storage.list("missing/")) == []
+
+
+def test_list_pages_large_directories(storage, monkeypatch):
+    monkeypatch.setattr("devlaunch.storage.LIST_PAGE_SIZE", 2)
+
+    pages = list(storage.list())
+
+    assert [len(page) for page in pages] == [2, 1]
+
+
+def test_get_reads_in_chunks(storage):
+    obj = storage.get("pg/docker-compose.j2")
+
+    assert list(obj["Body"].iter_chunks(6)) == [b"image:", b" postg", b"res"]
+    assert obj["ContentLength"] == 15
+    obj["Body"].close()
+
+
+def test_get_honours_range_and_etag(storage):
+    etag = storage.get("pg/template.yaml")["ETag"]
+
+    partial = storage.get("pg/template.yaml", byte_range="bytes=0-3")
+    assert partial["Body"].read() == b"tags"
+    assert partial["ContentRange"] == "bytes 0-3/16"
+
+    with pytest.raises(NotModified):
+        storage.get("pg/template.yaml", if_none_match=etag)
+    with pytest.raises(InvalidRange):
+        storage.get("pg/template.yaml", byte_range="bytes=99-")
+
+
+def test_empty_files_can_be_read(storage):
+    storage.put("empty.txt", b"")
+
+    assert storage.read("empty.txt") == b""
+    assert storage.get("empty.txt")["Body"].read() == b""
+
+
+def test_keys_cannot_escape_root(storage):
+    with pytest.raises(NotFound):
+        storage.get("../outside.txt")
+
+
+def test_delete_ignores_missing_keys(storage):
+    storage.delete("pg/template.yaml")
+    storage.delete("pg/template.yaml")
+
+    with pytest.raises(NotFound):
+        storage.read("pg/template.yaml")